@@ -0,0 +1,116 @@
+import os
+import json
+import mmap
+import fcntl
+import threading
+import numpy as np
+
+# File layout: a fixed-size header (magic, JSON metadata, sparse time index), then one
+# contiguous region per column, each reserving `capacity` rows so bars can be appended
+# in place. Columns are mapped straight from the file; nothing is parsed or copied.
+MAGIC = b"PYSTKBAR"
+HEADER_SIZE = 64 * 1024
+MIN_CAPACITY = 1024      # Rows reserved per column in a new archive
+INDEX_ENTRIES = 2048     # Most sparse index entries kept in the header
+
+def index_stride(rows):
+    """Return the rows between sparse index entries: a power of two keeping the index small."""
+    stride = 256
+    while rows // stride >= INDEX_ENTRIES:
+        stride *= 2
+    return stride
+
+def _layout(columns, capacity):
+    """Return the byte offset of each (name, dtype) column region and the total file size."""
+    offsets = {}
+    position = HEADER_SIZE
+    for name, dtype in columns:
+        offsets[name] = position
+        position += capacity * np.dtype(dtype).itemsize
+    return offsets, position
+
+def _read_header(f):
+    """Return the archive metadata at the start of an open file, or None if it isn't one."""
+    head = os.pread(f.fileno(), HEADER_SIZE, 0)
+    if len(head) < len(MAGIC) + 4 or not head.startswith(MAGIC):
+        return None
+    length = int.from_bytes(head[len(MAGIC):len(MAGIC) + 4], "little")
+    try:
+        return json.loads(head[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+    except ValueError:
+        return None
+
+def _write_header(fd, meta):
+    """Write the metadata block; this is the commit point of every write."""
+    payload = json.dumps(meta).encode()
+    if len(MAGIC) + 4 + len(payload) > HEADER_SIZE:
+        raise ValueError("Archive metadata does not fit in the header")
+    os.pwrite(fd, MAGIC + len(payload).to_bytes(4, "little") + payload, 0)
+
+def _header_meta(ts, columns, capacity, meta):
+    """Return the header for the given rows: layout, row count, sparse index and caller metadata."""
+    stride = index_stride(len(ts))
+    return dict(meta, columns=columns, capacity=capacity, rows=len(ts),
+                index_stride=stride, index=np.asarray(ts[::stride]).tolist())
+
+def read(path):
+    """Map an archive into memory and return (ts, {name: array}, meta), or None if unreadable.
+
+    The arrays are read-only views on the file. Later appends by a writer don't
+    disturb them, and a rewrite replaces the file, leaving existing mappings intact.
+    """
+    try:
+        with open(path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_SH)
+            meta = _read_header(f)
+            if meta is None:
+                return None
+            offsets, size = _layout(meta["columns"], meta["capacity"])
+            if os.fstat(f.fileno()).st_size < size:
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # The mapping holds a duplicate of the descriptor, which would keep the lock
+            fcntl.flock(f, fcntl.LOCK_UN)
+    except (OSError, ValueError, KeyError):
+        return None
+    rows = meta["rows"]
+    arrays = {name: np.frombuffer(buffer, dtype=dtype, count=rows, offset=offsets[name])
+              for name, dtype in meta["columns"]}
+    ts = arrays.pop("ts")
+    return ts, arrays, meta
+
+def write(path, ts, columns, meta, keep=0):
+    """Persist bars, appending in place when every row on disk is among the first `keep`, unchanged.
+
+    The file is rewritten (into a new file renamed over the old one) when a row already
+    on disk changes (e.g. a revised last bar), the columns differ or the reserved
+    capacity is used up. Rows readers have mapped are never written over.
+    """
+    arrays = {"ts": np.asarray(ts, dtype=np.int64)}
+    arrays.update((name, np.asarray(values)) for name, values in columns.items()
+                  if np.asarray(values).dtype.kind in "biuf")
+    layout = [[name, values.dtype.str] for name, values in arrays.items()]
+    rows = len(ts)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    if keep and os.path.exists(path):
+        with open(path, "r+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            old = _read_header(f)
+            if old is not None and old["columns"] == layout and old["capacity"] >= rows and old["rows"] == keep:
+                offsets, _ = _layout(layout, old["capacity"])
+                # Only the new rows are written, past the end readers have mapped
+                for name, values in arrays.items():
+                    os.pwrite(f.fileno(), values[keep:].tobytes(), offsets[name] + keep * values.itemsize)
+                _write_header(f.fileno(), _header_meta(ts, layout, old["capacity"], meta))
+                return
+
+    capacity = max(MIN_CAPACITY, 2 * rows)
+    offsets, size = _layout(layout, capacity)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.truncate(size)
+        for name, values in arrays.items():
+            os.pwrite(f.fileno(), values.tobytes(), offsets[name])
+        _write_header(f.fileno(), _header_meta(ts, layout, capacity, meta))
+    os.replace(tmp_path, path)
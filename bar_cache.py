@@ -0,0 +1,415 @@
+import os
+import re
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+import bar_archive
+import tracing
+from bars import Bars, to_timestamps, volume_array
+
+# Where the per-(ticker, interval) bar files live; override with PYSTOCK_CACHE_DIR
+CACHE_DIR = os.environ.get(
+    "PYSTOCK_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "pystock")
+)
+
+# Approximate bar length of each yfinance interval, in seconds
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "90m": 5400,
+    "1h": 3600,
+    "1d": 86400,
+    "5d": 5 * 86400,
+    "1wk": 7 * 86400,
+    "1mo": 30 * 86400,
+    "3mo": 91 * 86400,
+}
+
+# Stores already loaded in this process, keyed by (ticker, interval)
+_stores = {}
+_stores_lock = threading.Lock()
+_key_locks = {}  # (ticker, interval) -> lock serializing load_bars calls for that store
+
+def refresh_after(interval):
+    """Seconds a store may go without contacting the provider before its tail is refreshed."""
+    # One bar length, but never less than a minute or more than 15 minutes
+    return max(60, min(INTERVAL_SECONDS.get(interval, 86400), 900))
+
+def parse_period(period):
+    """Split a yfinance period string into (unit, count), e.g. '6mo' -> ('mo', 6)."""
+    if period in ("max", "ytd"):
+        return period, None
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    return match.group(2), int(match.group(1))
+
+def period_start(period, now, interval="1d"):
+    """Return the UTC timestamp a calendar period starts at, or None for 'max' and day counts."""
+    unit, count = parse_period(period)
+    if unit == "max" or unit == "d":
+        # 'max' has no start and 'Nd' counts trading sessions rather than calendar days
+        return None
+    if unit == "ytd":
+        start = pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+    elif unit == "wk":
+        start = now - pd.Timedelta(weeks=count)
+    elif unit == "mo":
+        start = now - pd.DateOffset(months=count)
+    else:
+        start = now - pd.DateOffset(years=count)
+    # Daily and longer bars are stamped at local midnight, so include the whole first day
+    if INTERVAL_SECONDS.get(interval, 86400) >= 86400:
+        start = start.normalize()
+    return start
+
+def _store_path(ticker, interval):
+    """Return the file path holding the bars for a ticker and interval."""
+    safe_ticker = ticker.replace(os.sep, "_")
+    return os.path.join(CACHE_DIR, "bars", f"{safe_ticker}_{interval}.bars")
+
+class BarStore:
+    """Columnar OHLCV bars for one (ticker, interval) plus the time span they cover."""
+
+    def __init__(self, ticker, interval, ts, columns, tz, index_name, start=None, full=False, fetched=0.0,
+                 index=None, index_stride=None):
+        self.ticker = ticker
+        self.interval = interval
+        self.ts = ts                  # int64 nanoseconds since epoch, UTC, ascending
+        self.columns = columns        # column name -> NumPy array aligned with ts
+        if "Volume" in columns:
+            # Held as uint64 so Bars views share the array instead of converting it
+            columns["Volume"] = volume_array(columns["Volume"])
+        self.tz = tz                  # exchange timezone used to rebuild the index
+        self.index_name = index_name  # 'Date' for daily bars, 'Datetime' for intraday
+        self.start = start            # ns timestamp from which the store is complete
+        self.full = full              # True when the store holds the entire history ('max')
+        self.fetched = fetched        # wall-clock seconds of the last provider contact
+        self.index = None if index is None else np.asarray(index, dtype=np.int64)  # ts every index_stride rows
+        self.index_stride = index_stride
+        self.persisted = len(ts) if index is not None else 0  # Leading rows identical to the file's
+
+    @classmethod
+    def from_frame(cls, ticker, interval, frame, start=None, full=False):
+        """Build a store from a yfinance history DataFrame."""
+        index = frame.index
+        tz = str(index.tz) if index.tz is not None else "UTC"
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        ts = to_timestamps(index)
+        columns = {name: frame[name].to_numpy() for name in frame.columns}
+        first = int(ts[0]) if len(ts) else None
+        start = first if start is None else min(start, first) if first is not None else start
+        return cls(ticker, interval, ts, columns, tz, index.name or "Date", start, full, time.time())
+
+    @classmethod
+    def load(cls, ticker, interval, path=None):
+        """Map a store from disk, or return None if there is none (or it is unreadable)."""
+        path = path or _store_path(ticker, interval)
+        if not os.path.exists(path):
+            return None
+        if path.endswith(".npz"):
+            return cls._load_npz(ticker, interval, path)
+        loaded = bar_archive.read(path)
+        if loaded is None:
+            return None
+        ts, columns, meta = loaded
+        return cls(ticker, interval, ts, columns, meta["tz"], meta["index_name"], meta["start"],
+                   meta["full"], meta["fetched"], meta["index"], meta["index_stride"])
+
+    @classmethod
+    def _load_npz(cls, ticker, interval, path):
+        """Load a store saved as .npz, the format replay fixtures were first recorded in."""
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                meta = json.loads(str(archive["meta"]))
+                columns = {name: archive[f"col_{name}"] for name in meta["columns"]}
+                ts = archive["ts"]
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(ticker, interval, ts, columns, meta["tz"], meta["index_name"],
+                   meta["start"], meta["full"], meta["fetched"])
+
+    def save(self, path=None):
+        """Write the store to its archive, appending in place when its older rows are unchanged.
+
+        Afterwards the store's arrays are mapped from the file rather than held in memory.
+        """
+        path = path or _store_path(self.ticker, self.interval)
+        meta = {
+            "tz": self.tz,
+            "index_name": self.index_name,
+            "start": self.start,
+            "full": self.full,
+            "fetched": self.fetched,
+        }
+        bar_archive.write(path, self.ts, self.columns, meta, keep=self.persisted)
+        loaded = bar_archive.read(path)
+        if loaded is not None:
+            self.ts, self.columns, meta = loaded
+            self.index = np.asarray(meta["index"], dtype=np.int64)
+            self.index_stride = meta["index_stride"]
+            self.persisted = len(self.ts)
+
+    def position(self, value):
+        """Return where a ns timestamp falls in ts (as np.searchsorted), narrowed by the sparse index."""
+        if self.index is None:
+            return int(np.searchsorted(self.ts, value))
+        # index[b] = ts[b * stride]: find the last entry below value, then search only its block
+        block = int(np.searchsorted(self.index, value)) - 1
+        if block < 0:
+            return 0
+        lo = block * self.index_stride
+        hi = min(lo + self.index_stride, len(self.ts))
+        return lo + int(np.searchsorted(self.ts[lo:hi], value))
+
+    def is_stale(self):
+        """Check whether the provider should be asked for bars newer than the last one held."""
+        return time.time() - self.fetched > refresh_after(self.interval)
+
+    def merge(self, other):
+        """Merge a newer fetch into the store, keeping older bars only if the two are contiguous."""
+        first_new = other.ts[0]
+        # Old bars survive only if they reach the span the new fetch covers; the provider's
+        # copy wins wherever the two overlap (the last bar may have been partial)
+        other_start = first_new if other.start is None else other.start
+        contiguous = len(self.ts) > 0 and self.ts[-1] >= other_start
+        keep = self.ts < first_new if contiguous else np.zeros(len(self.ts), dtype=bool)
+        names = list(dict.fromkeys(list(self.columns) + list(other.columns)))
+        merged = {}
+        for name in names:
+            old = self.columns.get(name)
+            new = other.columns.get(name)
+            if old is None:
+                old = np.zeros(len(self.ts), dtype=new.dtype)
+            if new is None:
+                new = np.zeros(len(other.ts), dtype=old.dtype)
+            merged[name] = np.concatenate([old[keep], new])
+        kept = int(keep.sum())
+        same = self._unchanged_overlap(other, kept) if contiguous else 0
+        self.ts = np.concatenate([self.ts[keep], other.ts])
+        self.columns = merged
+        # Kept rows (and refetched rows that came back identical) are a prefix of the old
+        # ones, so only the rows after them need writing
+        self.persisted = min(self.persisted, kept + same)
+        self.index = None
+        self.tz = other.tz
+        if contiguous:
+            self.start = min(s for s in (self.start, other.start) if s is not None)
+            self.full = self.full or other.full
+        else:
+            self.start = other.start
+            self.full = other.full
+        self.fetched = other.fetched
+
+    def _unchanged_overlap(self, other, kept):
+        """Return how many of `other`'s leading bars are identical to the stored ones from `kept` on."""
+        overlap = min(len(self.ts) - kept, len(other.ts))
+        if overlap <= 0 or set(self.columns) != set(other.columns):
+            return 0
+        equal = self.ts[kept:kept + overlap] == other.ts[:overlap]
+        for name, values in self.columns.items():
+            old, new = values[kept:kept + overlap], other.columns[name][:overlap]
+            equal &= (old == new) | (np.isnan(old) & np.isnan(new) if old.dtype.kind == "f" else False)
+        return overlap if equal.all() else int(np.argmin(equal))
+
+    def readjusted(self, other):
+        """Check whether a tail fetch shows the provider re-adjusted the bars the store holds.
+
+        Prices come split- and dividend-adjusted, so a split or dividend on a bar newer than
+        the store's, or a changed close on a bar that was already final, means older bars
+        changed too.
+        """
+        last = self.ts[-1]
+        newer = other.ts > last
+        for name in ("Stock Splits", "Dividends"):
+            values = other.columns.get(name)
+            if values is not None and np.any(np.nan_to_num(values[newer].astype(float)) != 0):
+                return True
+        # Bars before the store's last one (which may have been partial) are final
+        final = other.ts < last
+        positions = np.searchsorted(self.ts, other.ts[final])
+        if len(positions) == 0 or "Close" not in self.columns or "Close" not in other.columns:
+            return False
+        if not np.array_equal(self.ts[positions], other.ts[final]):
+            return True
+        return not np.allclose(self.columns["Close"][positions], other.columns["Close"][final],
+                               rtol=1e-6, atol=0, equal_nan=True)
+
+    def tail_start(self):
+        """Return where a tail fetch starts: the bar before the last, so one final bar is refetched to compare."""
+        return pd.Timestamp(int(self.ts[-2 if len(self.ts) > 1 else -1]), tz="UTC").tz_convert(self.tz)
+
+    def _session_days(self, lo=0):
+        """Return the local calendar day of each bar from position lo onward, and a mask of
+        the bars in regular trading hours (None when all of them are)."""
+        import sessions  # Imports this module, so not at the top
+        local = self.to_bars(lo).local_ns()
+        regular = sessions.regular_hours(local, self.tz) if sessions.is_intraday(self.interval) else None
+        return local // sessions.DAY_NS, regular
+
+    def slice_bounds(self, period, now):
+        """Return (lo, covered): where the period starts in the store and whether it is complete."""
+        unit, count = parse_period(period)
+        if unit == "max":
+            return 0, self.full
+        if unit == "d":
+            # Only look at the recent tail; count sessions rather than calendar days
+            window = now - pd.Timedelta(days=count * 2 + 7)
+            lo = self.position(window.value)
+            days, regular = self._session_days(lo)
+            # Only days with regular-hours bars count, so before the open '1d' is still the
+            # last full session (followed by today's pre-market bars)
+            unique_days = np.unique(days if regular is None else days[regular])
+            if len(unique_days) < count:
+                return 0, self.full
+            first_day = unique_days[-count]
+            lo += int(np.searchsorted(days, first_day))
+            covered = self.full or (self.start is not None and self.start <= self.ts[lo])
+            return lo, covered
+        start = period_start(period, now, self.interval)
+        lo = self.position(start.value)
+        covered = self.full or (self.start is not None and self.start <= start.value)
+        return lo, covered
+
+    def to_bars(self, lo=0):
+        """Return the bars from position lo to the end as views on the store's arrays."""
+        column = lambda name: self.columns[name][lo:] if name in self.columns else np.zeros(len(self.ts) - lo)
+        return Bars(self.ts[lo:], column("Open"), column("High"), column("Low"), column("Close"),
+                    column("Volume"), self.tz)
+
+    def to_frame(self, lo=0):
+        """Rebuild a yfinance-shaped DataFrame from position lo to the end."""
+        index = pd.to_datetime(self.ts[lo:], utc=True).tz_convert(self.tz)
+        index.name = self.index_name
+        return pd.DataFrame({name: values[lo:] for name, values in self.columns.items()}, index=index)
+
+def _get_store(ticker, interval):
+    """Return the in-memory store for a ticker and interval, loading it from disk if needed."""
+    key = (ticker, interval)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = BarStore.load(ticker, interval)
+            if store is not None:
+                _stores[key] = store
+        return store
+
+def _put_store(store):
+    """Remember a store in memory and persist it."""
+    with _stores_lock:
+        _stores[(store.ticker, store.interval)] = store
+    store.save()
+
+def _key_lock(ticker, interval):
+    """Return the lock guarding one (ticker, interval) store."""
+    with _stores_lock:
+        return _key_locks.setdefault((ticker, interval), threading.Lock())
+
+def load_bars(ticker, interval, period, fetch):
+    """Return Bars for a period (None if there are none), fetching only what the local store is missing.
+
+    `fetch(ticker, interval, period=None, start=None)` must return a yfinance-style
+    history DataFrame, either for a whole period or for everything from `start` on.
+    Concurrent calls for the same ticker and interval are serialized, so a second
+    caller is served from what the first one fetched.
+    """
+    with _key_lock(ticker, interval):
+        return _load_bars(ticker, interval, period, fetch)
+
+def _load_bars(ticker, interval, period, fetch):
+    """Body of load_bars, run while holding the store's lock."""
+    now = pd.Timestamp.now(tz="UTC")
+    store = _get_store(ticker, interval)
+    changed = False
+
+    if store is not None and len(store.ts) and store.is_stale():
+        unit, count = parse_period(period)
+        start = period_start(period, now, interval)
+        if unit == "d":
+            start = now - pd.Timedelta(days=count + 7)
+        # Only top up the tail when it joins onto the requested window
+        if start is None or store.ts[-1] >= start.value:
+            tracing.count("bar_cache.tail")
+            first = store.tail_start()
+            tail = fetch(ticker, interval, start=first)
+            if tail is not None and not tail.empty:
+                fresh = BarStore.from_frame(ticker, interval, tail, start=first.value)
+                if store.readjusted(fresh):
+                    # A split or dividend re-adjusted the history: start over from the provider's
+                    tracing.count("bar_cache.readjusted")
+                    store = None
+                else:
+                    store.merge(fresh)
+            else:
+                # Nothing new yet (e.g. market closed); don't ask again until the next refresh
+                store.fetched = time.time()
+            changed = True
+
+    if store is not None and len(store.ts):
+        lo, covered = store.slice_bounds(period, now)
+        # The store must also reach the present: a stale one whose tail was too old to
+        # top up holds nothing of the window, however far back its start goes
+        covered = covered and not store.is_stale()
+    else:
+        covered = False
+
+    tracing.count("bar_cache.miss" if not covered else "bar_cache.hit")
+    if not covered:
+        unit, count = parse_period(period)
+        # A few days of intraday bars hold a whole regular session even before today's open
+        fetch_period = "5d" if unit == "d" and count < 5 and INTERVAL_SECONDS.get(interval, 86400) < 86400 else period
+        frame = fetch(ticker, interval, period=fetch_period)
+        if frame is None or frame.empty:
+            return None
+        start = period_start(period, now, interval)
+        fresh = BarStore.from_frame(ticker, interval, frame,
+                                    start=None if start is None else start.value,
+                                    full=(period == "max"))
+        if store is None:
+            store = fresh
+        else:
+            store.merge(fresh)
+        changed = True
+        lo, _ = store.slice_bounds(period, now)
+
+    if changed:
+        _put_store(store)
+    return store.to_bars(lo)
+
+def refresh_tail(ticker, interval, since, fetch, first=None):
+    """Fetch bars after the last one stored and return everything from `since` on, as Bars.
+
+    If a split or dividend re-adjusted the history, the store's whole span is fetched
+    again and everything from `first` (the caller's first bar) on is returned instead.
+    Returns None when there is no store yet to extend.
+    """
+    with _key_lock(ticker, interval):
+        store = _get_store(ticker, interval)
+        if store is None or len(store.ts) == 0:
+            return None
+        start = store.tail_start()
+        tail = fetch(ticker, interval, start=start)
+        if tail is not None and not tail.empty:
+            fresh = BarStore.from_frame(ticker, interval, tail, start=start.value)
+            if store.readjusted(fresh):
+                tracing.count("bar_cache.readjusted")
+                span = pd.Timestamp(int(store.ts[0]), tz="UTC").tz_convert(store.tz)
+                frame = fetch(ticker, interval, start=span)
+                if frame is not None and not frame.empty:
+                    store = BarStore.from_frame(ticker, interval, frame, start=store.start, full=store.full)
+                    since = since if first is None else first
+            else:
+                store.merge(fresh)
+        else:
+            store.fetched = time.time()
+        _put_store(store)
+        lo = store.position(pd.Timestamp(since).tz_convert("UTC").value)
+        return store.to_bars(lo)
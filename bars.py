@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+# Columns every Bars holds, under yfinance's names
+OHLCV = ("Open", "High", "Low", "Close", "Volume")
+HOUR_NS = 3600 * 10**9
+
+def volume_array(values):
+    """Return volumes as uint64, without copying if they already are; missing volume counts as 0."""
+    values = np.asarray(values)
+    if values.dtype == np.uint64:
+        return values
+    if values.dtype.kind == "f":
+        values = np.nan_to_num(values, nan=0.0)
+    return values.astype(np.uint64)
+
+def to_timestamps(index):
+    """Return a DatetimeIndex as int64 nanoseconds since the epoch (UTC for tz-aware indexes)."""
+    if getattr(index, "tz", None) is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return np.asarray(index.values.astype("datetime64[ns]").astype(np.int64))
+
+class Bars:
+    """Columnar OHLCV bars: int64 UTC nanosecond times, float64 prices and uint64 volume.
+
+    Slicing by position or time range returns views on the same arrays, never copies,
+    so a period switch is a slice. Extra per-bar series (e.g. indicator overlays) are
+    carried in `extra` and sliced along with the bars.
+    """
+
+    __slots__ = ("ts", "open", "high", "low", "close", "volume", "tz", "extra")
+
+    def __init__(self, ts, open_, high, low, close, volume, tz="UTC", extra=None):
+        self.ts = np.asarray(ts, dtype=np.int64)
+        self.open = np.asarray(open_, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = volume_array(volume)
+        self.tz = tz              # exchange timezone, for labels and rebuilding an index
+        self.extra = extra or {}  # name -> array aligned with ts
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Build bars from a yfinance-style history DataFrame."""
+        index = frame.index
+        tz = str(index.tz) if getattr(index, "tz", None) is not None else "UTC"
+        column = lambda name: frame[name].to_numpy() if name in frame.columns else np.zeros(len(frame))
+        return cls(to_timestamps(index), column("Open"), column("High"), column("Low"),
+                   column("Close"), column("Volume"), tz)
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def empty(self):
+        return len(self.ts) == 0
+
+    @property
+    def columns(self):
+        """Names accepted by bars[name]: the OHLCV columns, then any extra series."""
+        return OHLCV + tuple(self.extra)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays this view spans."""
+        arrays = (self.ts, self.open, self.high, self.low, self.close, self.volume) + tuple(self.extra.values())
+        return sum(np.asarray(a).nbytes for a in arrays)
+
+    def __getitem__(self, key):
+        """Return a column array by name, or a view of a positional slice of the bars."""
+        if isinstance(key, slice):
+            return Bars(self.ts[key], self.open[key], self.high[key], self.low[key], self.close[key],
+                        self.volume[key], self.tz, {name: values[key] for name, values in self.extra.items()})
+        arrays = {"Open": self.open, "High": self.high, "Low": self.low, "Close": self.close, "Volume": self.volume}
+        if key in arrays:
+            return arrays[key]
+        return self.extra[key]
+
+    def between(self, start=None, end=None):
+        """Return a view of the bars with start <= time < end (either bound may be None)."""
+        lo = 0 if start is None else int(np.searchsorted(self.ts, _ns(start)))
+        hi = len(self.ts) if end is None else int(np.searchsorted(self.ts, _ns(end)))
+        return self[lo:hi]
+
+    def time(self, position):
+        """Return the time of one bar as a tz-aware Timestamp."""
+        return pd.Timestamp(int(self.ts[position]), tz="UTC").tz_convert(self.tz)
+
+    @property
+    def index(self):
+        """Bar times as a tz-aware DatetimeIndex (built on demand)."""
+        return pd.to_datetime(self.ts, utc=True).tz_convert(self.tz)
+
+    def assign(self, **extra):
+        """Return the same bars with extra series added; existing arrays are shared."""
+        return Bars(self.ts, self.open, self.high, self.low, self.close, self.volume, self.tz,
+                    {**self.extra, **{name: np.asarray(values) for name, values in extra.items()}})
+
+    def splice(self, new):
+        """Return these bars with everything from `new`'s first bar on replaced by `new`."""
+        keep = int(np.searchsorted(self.ts, new.ts[0])) if len(new) else len(self.ts)
+        join = lambda old, fresh: np.concatenate([old[:keep], fresh])
+        return Bars(join(self.ts, new.ts), join(self.open, new.open), join(self.high, new.high),
+                    join(self.low, new.low), join(self.close, new.close), join(self.volume, new.volume), new.tz)
+
+    def take(self, rows):
+        """Return a copy holding only the bars at the given positions (an index array or mask)."""
+        return Bars(self.ts[rows], self.open[rows], self.high[rows], self.low[rows], self.close[rows],
+                    self.volume[rows], self.tz, {name: values[rows] for name, values in self.extra.items()})
+
+    def local_ns(self):
+        """Return bar times as int64 nanoseconds in the exchange's local wall-clock time.
+
+        Zone offsets only change on the hour, so for dense (intraday) bars they are
+        looked up once per hour spanned and broadcast, not converted bar by bar.
+        """
+        if self.empty:
+            return self.ts.copy()
+        hour = self.ts // HOUR_NS
+        span = int(hour[-1] - hour[0]) + 1
+        if span > len(self.ts):
+            return np.asarray(self.index.tz_localize(None).values.astype("datetime64[ns]").astype(np.int64))
+        starts = (hour[0] + np.arange(span)) * HOUR_NS
+        local = pd.to_datetime(starts, utc=True).tz_convert(self.tz).tz_localize(None)
+        offsets = local.values.astype("datetime64[ns]").astype(np.int64) - starts
+        return self.ts + offsets[hour - hour[0]]
+
+    def to_frame(self):
+        """Rebuild a yfinance-shaped DataFrame (with any extra series as columns)."""
+        columns = {name: self[name] for name in self.columns}
+        return pd.DataFrame(columns, index=self.index)
+
+def _ns(when):
+    """Convert a time (naive ones are taken as UTC) to int64 nanoseconds since the epoch."""
+    when = pd.Timestamp(when)
+    if when.tz is None:
+        when = when.tz_localize("UTC")
+    return when.tz_convert("UTC").value
@@ -0,0 +1,84 @@
+import os
+import sys
+import plotext as plt
+from concurrent.futures import ProcessPoolExecutor
+import term_chart as tc
+import stock_data
+import providers
+import compare
+
+INFO_WAIT = 10  # Seconds a worker waits for a ticker's metadata before rendering without it
+
+def _init_worker(columns, lines, rate):
+    """Fix the render size in each worker process; there is no terminal to ask."""
+    tc.set_terminal_size(columns, lines)
+    # Workers share the provider's rate limit rather than each taking all of it
+    providers.set_rate_limit(rate)
+
+def render_snapshot(ticker, period, interval, plot_type, color=True):
+    """Fetch one ticker and return (ticker, frame, error) with the chart-view output as text."""
+    # Start the metadata lookup first so it overlaps the history fetch
+    stock_data.get_stock_info(ticker)
+    data, info = stock_data.get_stock_data(ticker, period=period, interval=interval)
+    if data is None or data.empty:
+        return ticker, None, info.get("error", f"No data for {ticker}")
+    info = stock_data.get_stock_info(ticker, wait=INFO_WAIT)
+    try:
+        frame = tc.render_stock_data(data, info, plot_type=plot_type, interval=interval,
+                                     timeframe=period, instructions="")
+    except Exception as e:
+        return ticker, None, f"Error plotting data: {str(e)}"
+    if not color:
+        frame = plt.uncolorize(frame)
+    return ticker, frame, None
+
+def _render(job):
+    """Unpack a job tuple for the process pool."""
+    return render_snapshot(*job)
+
+def run_batch(tickers, period="6mo", interval="1d", plot_type="line", out=None,
+              columns=120, lines=50, workers=None, color=True):
+    """Render snapshots for many tickers across a process pool; return the number that failed.
+
+    Frames go to `out`/<TICKER>.txt when an output directory is given, otherwise to
+    stdout in ticker order. Errors are reported on stderr.
+    """
+    if out:
+        os.makedirs(out, exist_ok=True)
+    jobs = [(ticker, period, interval, plot_type, color) for ticker in tickers]
+    failed = 0
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    rate = providers.RATE_LIMIT / workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(columns, lines, rate)) as pool:
+        # Results stream back in ticker order while later tickers are still rendering
+        for ticker, frame, error in pool.map(_render, jobs):
+            if error:
+                failed += 1
+                print(f"{ticker}: {error}", file=sys.stderr)
+                continue
+            if out:
+                with open(os.path.join(out, f"{ticker.replace(os.sep, '_')}.txt"), "w") as f:
+                    f.write(frame + "\n")
+            else:
+                sys.stdout.write(f"==== {ticker} ====\n{frame}\n\n")
+                sys.stdout.flush()
+    return failed
+
+def run_compare(tickers, period="6mo", interval="1d", out=None, columns=120, lines=50, color=True):
+    """Render one comparison snapshot of several tickers; return the number without data."""
+    tc.set_terminal_size(columns, lines)
+    series = compare.fetch(tickers, period, interval)
+    for ticker in tickers:
+        if ticker not in series:
+            print(f"{ticker}: No data for {ticker}", file=sys.stderr)
+    frame = compare.render_compare(series, interval=interval, timeframe=period, instructions="")
+    if not color:
+        frame = plt.uncolorize(frame)
+    if out:
+        os.makedirs(out, exist_ok=True)
+        with open(os.path.join(out, "compare.txt"), "w") as f:
+            f.write(frame + "\n")
+    else:
+        sys.stdout.write(frame + "\n")
+    return len(tickers) - len(series)
@@ -0,0 +1,172 @@
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import contextlib
+import tracemalloc
+import numpy as np
+import plotext as plt
+import term_chart as tc
+import stock_data
+import indicators
+import downsample
+import providers
+import sessions
+
+SIZES = [20, 1_000, 10_000, 100_000, 1_000_000]
+WIDTHS = [80, 160, 240]
+STAGES = ["get_stock_data", "display_stock_summary", "indicators", "downsample", "sessions",
+          "plot_price_chart[line]", "plot_price_chart[candle]", "plot_volume_chart", "plot_sma_chart"]
+NOISE_MS = 1.0  # Slowdowns smaller than this are never reported as regressions
+
+def bench_interval(bars):
+    """Return the interval to generate `bars` bars at; long daily series would run past 1677."""
+    return "1d" if bars <= 10_000 else "1m"
+
+def _silent(func, *args, **kwargs):
+    """Call a printing function with its output discarded."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+def _stages(bars, width):
+    """Return [(stage, thunk)] covering the pipeline for one series length and terminal width.
+
+    Inputs to each stage are prepared once up front, so every thunk times only its own work.
+    """
+    interval = bench_interval(bars)
+    stock_data.set_provider(providers.SyntheticProvider(bars=bars))
+    tc.set_terminal_size(width, 50)
+    data, info = stock_data.get_stock_data("BENCH", period="max", interval=interval)
+    info = stock_data.get_stock_info("BENCH", wait=5)
+    name = info.get("longName", "BENCH")
+    period = tc.adaptive_sma_period(len(data))
+    sma = indicators.SMA(period)
+    overlays = {f"SMA_{period}": indicators.compute(sma, data)["sma"]}
+    reduced = {plot_type: downsample.downsample_bars(data, tc.chart_width(), plot_type, extra=overlays)
+               for plot_type in ("line", "candle")}
+    split = sessions.find_sessions(data, interval)
+    labels = {plot_type: (list(range(len(view))), sessions.ticks(split, data, view, tc.chart_width()))
+              for plot_type, view in reduced.items()}
+
+    def price(plot_type):
+        x, ticks = labels[plot_type]
+        return lambda: _silent(tc.plot_price_chart, reduced[plot_type], name, x, ticks, plot_type, interval, "max", period)
+
+    def session_ticks():
+        split = sessions.find_sessions(data, interval)
+        return sessions.ticks(split, data, reduced["line"], tc.chart_width())
+
+    line_x, line_ticks = labels["line"]
+    return [
+        ("get_stock_data", lambda: stock_data.get_stock_data("BENCH", period="max", interval=interval)),
+        ("display_stock_summary", lambda: _silent(tc.display_stock_summary, data, info)),
+        ("indicators", lambda: indicators.compute(sma, data)),
+        ("downsample", lambda: downsample.downsample_bars(data, tc.chart_width(), "line", extra=overlays)),
+        ("sessions", session_ticks),
+        ("plot_price_chart[line]", price("line")),
+        ("plot_price_chart[candle]", price("candle")),
+        ("plot_volume_chart", lambda: _silent(tc.plot_volume_chart, reduced["line"], name, line_x, line_ticks)),
+        ("plot_sma_chart", lambda: _silent(tc.plot_sma_chart, reduced["line"], name, line_x, line_ticks, period)),
+    ]
+
+def measure(thunk, repeat):
+    """Time `repeat` calls, then one more under tracemalloc; return latency percentiles and peak memory."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        thunk()
+        samples.append((time.perf_counter() - start) * 1000)
+    # Tracing slows allocation down, so memory is measured on a separate call
+    tracemalloc.start()
+    try:
+        thunk()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {"p50_ms": round(float(p50), 3), "p90_ms": round(float(p90), 3), "p99_ms": round(float(p99), 3),
+            "max_ms": round(max(samples), 3), "peak_kib": round(peak / 1024, 1), "runs": repeat}
+
+def run(sizes=SIZES, widths=WIDTHS, repeat=5, stages=None, progress=None):
+    """Benchmark every stage for each size and width; return {'stage|bars|width': result}."""
+    results = {}
+    for bars in sizes:
+        for width in widths:
+            for stage, thunk in _stages(bars, width):
+                if stages and stage not in stages:
+                    continue
+                # The fetch doesn't depend on the width, so it is timed at the first one only
+                if stage == "get_stock_data" and width != widths[0]:
+                    continue
+                results[f"{stage}|{bars}|{width}"] = result = measure(thunk, repeat)
+                if progress:
+                    progress(stage, bars, width, result)
+    return results
+
+def environment():
+    """Describe what the numbers were measured on."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plotext": getattr(plt, "__version__", "unknown"),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+def compare(results, baseline, tolerance):
+    """Return [(key, now, before)] for stages whose median got slower than the baseline allows."""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get("results", {}).get(key)
+        if before is None:
+            continue
+        now, then = result["p50_ms"], before["p50_ms"]
+        if now > then * tolerance and now - then > NOISE_MS:
+            regressions.append((key, now, then))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the fetch -> render pipeline on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="series lengths in bars")
+    parser.add_argument("--widths", type=int, nargs="+", default=WIDTHS, help="terminal widths in columns")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, help="only run these stages")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage (default: 5)")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="baseline file to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown factor of the median (default: 1.25)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.save:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    print(f"{'stage':<26}{'bars':>9}{'width':>7}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}{'peak KiB':>11}{'baseline':>10}")
+    def progress(stage, bars, width, result):
+        before = (baseline or {}).get("results", {}).get(f"{stage}|{bars}|{width}")
+        ratio = f"{result['p50_ms'] / before['p50_ms']:.2f}x" if before and before["p50_ms"] else "-"
+        print(f"{stage:<26}{bars:>9}{width:>7}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+              f"{result['max_ms']:>10.2f}{result['peak_kib']:>11.1f}{ratio:>10}", flush=True)
+
+    results = run(args.sizes, args.widths, args.repeat, args.stages, progress)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=1, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for key, now, then in regressions:
+        print(f"REGRESSION {key}: median {now:.2f} ms vs {then:.2f} ms", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
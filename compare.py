@@ -0,0 +1,189 @@
+import io
+import sys
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import plotext as plt
+import term_chart as tc
+import downsample
+import tracing
+from bar_cache import INTERVAL_SECONDS
+from stock_data import get_bars
+
+MAX_WORKERS = 8                 # Concurrent get_bars calls
+WINDOWS = [20, 60, 120, 252]    # Correlation windows (bars) 'w' cycles through
+MAX_TICKS = 8                   # Date labels along the x-axis
+# 256-color backgrounds from -1 (red) through 0 (grey) to +1 (green)
+HEAT_COLORS = [196, 203, 210, 217, 224, 252, 194, 157, 120, 83, 46]
+# 256-color line colors, distinct enough for 20 symbols; the legend is printed under the chart
+LINE_COLORS = [46, 196, 33, 226, 201, 51, 208, 129, 118, 160, 27, 220, 165, 87, 202, 93, 154, 124, 39, 214]
+
+COMPARE_INSTRUCTIONS = "Press 'w' to change the correlation window, 't' to change time frame, 'q' or Enter to return"
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="compare")
+
+def fetch(symbols, period, interval):
+    """Fetch every symbol in parallel; return {symbol: Bars} for those with data, in input order."""
+    results = _executor.map(lambda symbol: get_bars(symbol, period, interval), symbols)
+    return {symbol: data for symbol, data in zip(symbols, results) if data is not None and not data.empty}
+
+def join_keys(data, interval):
+    """Return the int64 keys a series is joined on.
+
+    Daily-and-longer bars are keyed by their local trading day, so exchanges in
+    different timezones line up; intraday bars by their UTC time.
+    """
+    if INTERVAL_SECONDS.get(interval, 86400) >= 86400:
+        return data.index.tz_localize(None).values.astype("datetime64[D]").astype(np.int64)
+    return data.ts
+
+@tracing.traced("compare.align")
+def align(keys, values):
+    """Outer-join series on their keys.
+
+    Returns (union of keys, matrix) with one row per series and NaN where a series
+    has no bar; each series is placed with one searchsorted over the sorted union.
+    """
+    union = np.unique(np.concatenate(keys))
+    matrix = np.full((len(values), len(union)), np.nan)
+    for row, (series_keys, series_values) in enumerate(zip(keys, values)):
+        matrix[row, np.searchsorted(union, series_keys)] = series_values
+    return union, matrix
+
+def forward_fill(matrix):
+    """Carry each row's last value across its gaps (leading gaps stay NaN)."""
+    columns = np.arange(matrix.shape[1])
+    last = np.where(np.isnan(matrix), 0, columns)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return matrix[np.arange(matrix.shape[0])[:, None], last]
+
+def normalize(matrix):
+    """Return (start, percent change of each row from its value at `start`).
+
+    `start` is the first column where every series has traded; closed markets and
+    intraday gaps are bridged with the last price, so every line is continuous.
+    """
+    filled = forward_fill(matrix)
+    complete = np.flatnonzero(~np.isnan(filled).any(axis=0))
+    if len(complete) == 0:
+        return None, None
+    start = complete[0]
+    return start, (filled[:, start:] / filled[:, start:start + 1] - 1) * 100
+
+@tracing.traced("compare.correlation")
+def correlation(matrix, window):
+    """Return the correlation matrix of the last `window` returns, or None with too few bars.
+
+    Returns are taken between bars every series shares (an inner join), so a stale
+    price carried over another market's holiday never counts as a flat move.
+    """
+    common = matrix[:, ~np.isnan(matrix).any(axis=0)]
+    returns = np.diff(np.log(common), axis=1)[:, -window:]
+    if returns.shape[1] < 3:
+        return None
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.corrcoef(returns)
+
+def tick_labels(keys, positions, interval, tz):
+    """Format only the keys at tick positions: dates for daily bars, date and time intraday."""
+    if INTERVAL_SECONDS.get(interval, 86400) >= 86400:
+        return [f"{day[5:7]}/{day[8:10]}" for day in np.datetime_as_string(keys[positions].astype("datetime64[D]"))]
+    times = pd.to_datetime(keys[positions], utc=True).tz_convert(tz)
+    return list(times.strftime("%m/%d %H:%M"))
+
+def plot_overlay(symbols, keys, pct, interval, timeframe, tz):
+    """Plot every series as percent change from the common start."""
+    plt.clf()
+    terminal_width, _ = tc.terminal_size()
+    plt.plotsize(terminal_width - 5, 20)
+    plt.title(f"Change since {tick_labels(keys, [0], interval, tz)[0]} (%) ({interval} : {timeframe})")
+    x = np.arange(pct.shape[1])
+    # Each line keeps its own peaks and troughs at about one point per column
+    for position, row in enumerate(pct):
+        rows, _ = downsample.lttb(x, row, tc.chart_width())
+        plt.plot(x[rows].tolist(), row[rows].tolist(), color=LINE_COLORS[position % len(LINE_COLORS)])
+    positions = np.unique(np.linspace(0, len(x) - 1, min(MAX_TICKS, len(x))).astype(np.int64))
+    plt.xticks(positions.tolist(), tick_labels(keys, positions, interval, tz))
+    plt.show()
+    # One legend line instead of plotext's legend box, which would cover the lines
+    print("  ".join(f"\x1b[38;5;{LINE_COLORS[position % len(LINE_COLORS)]}m━━\x1b[0m {symbol} {row[-1]:+.1f}%"
+                    for position, (symbol, row) in enumerate(zip(symbols, pct))))
+
+def heat_cell(value, width):
+    """Format one correlation as a colored cell."""
+    if np.isnan(value):
+        return "--".center(width)
+    color = HEAT_COLORS[int(round((np.clip(value, -1, 1) + 1) / 2 * (len(HEAT_COLORS) - 1)))]
+    text = f"{value:+.2f}" if width >= 6 else f"{value:+.1f}"
+    return f"\x1b[48;5;{color}m\x1b[30m{text.center(width)}\x1b[0m"
+
+def heatmap(symbols, matrix, window):
+    """Return the correlation matrix as a table of colored cells."""
+    terminal_width, _ = tc.terminal_size()
+    label = max(len(symbol) for symbol in symbols) + 1
+    cell = max(4, min(7, (terminal_width - label - 1) // len(symbols)))
+    lines = [f"Correlation of returns over the last {window} bars",
+             " " * label + "".join(symbol[:cell - 1].center(cell) for symbol in symbols)]
+    for symbol, row in zip(symbols, matrix):
+        lines.append(symbol.ljust(label) + "".join(heat_cell(value, cell) for value in row))
+    return "\n".join(lines)
+
+def plot_compare(series, interval="1d", timeframe="1y", window=WINDOWS[1], instructions=COMPARE_INSTRUCTIONS):
+    """Plot {symbol: Bars} normalized to a common start, with their correlation heatmap."""
+    symbols = list(series)
+    if not symbols:
+        print("No data for any of the symbols.")
+        return
+    keys, matrix = align([join_keys(data, interval) for data in series.values()],
+                         [data.close for data in series.values()])
+    start, pct = normalize(matrix)
+    if start is None:
+        print("The symbols have no bars in common.")
+        return
+    tz = next(iter(series.values())).tz
+    plot_overlay(symbols, keys[start:], pct, interval, timeframe, tz)
+    corr = correlation(matrix[:, start:], window)
+    if corr is None:
+        print("\nNot enough common bars for a correlation matrix.")
+    else:
+        print("\n" + heatmap(symbols, corr, window))
+    print(f"\n{instructions}", end="", flush=True)
+
+@tracing.traced("render_compare")
+def render_compare(series, **kwargs):
+    """Return what plot_compare would print, as a string."""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        plot_compare(series, **kwargs)
+    return buffer.getvalue()
+
+def run_compare(symbols, period="1y", interval="1d"):
+    """Show the comparison view for several symbols until the user leaves."""
+    window = WINDOWS[1]
+    series = None
+    while True:
+        if series is None:
+            tc.clear_screen()
+            print(f"\nFetching {len(symbols)} symbols ({period} : {interval})...")
+            series = fetch(symbols, period, interval)
+            missing = [symbol for symbol in symbols if symbol not in series]
+        tc.clear_screen()
+        if missing:
+            print(f"No data for {', '.join(missing)}")
+        sys.stdout.write(render_compare(series, interval=interval, timeframe=period, window=window))
+        sys.stdout.flush()
+
+        key = tc.get_key()
+        if key.lower() == 'w':
+            window = WINDOWS[(WINDOWS.index(window) + 1) % len(WINDOWS)]
+        elif key.lower() == 't':
+            new_timeframe = tc.prompt_for_timeframe(interval)
+            if new_timeframe:
+                if isinstance(new_timeframe, tuple):
+                    period, interval = new_timeframe
+                else:
+                    period = new_timeframe
+                series = None
+        else:
+            return
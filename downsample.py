@@ -0,0 +1,64 @@
+import numpy as np
+from bars import Bars
+
+def bucket_starts(n, buckets):
+    """Return the first row of each of `buckets` near-equal, contiguous buckets over n rows."""
+    return np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+
+def lttb(x, y, threshold):
+    """Pick `threshold` points with largest-triangle-three-buckets.
+
+    Returns (selected, starts): the chosen row of each bucket and the first row of
+    each bucket. The first and last points are always kept as their own buckets.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        rows = np.arange(n)
+        return rows, rows
+
+    # threshold - 2 buckets over rows 1..n-2, then the last point as a bucket of its own
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(np.int64), n)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_lo, next_hi = edges[b + 1], edges[b + 2]
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        # Twice the area of the triangle (previous pick, candidate, next bucket's average)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    starts = np.concatenate([[0], edges[:-1]])
+    return selected, starts
+
+def downsample_bars(data, points, plot_type="line", extra=None):
+    """Reduce Bars to at most `points` bars for plotting.
+
+    Both modes aggregate each bucket as first open, max high, min low and summed
+    volume. Candle mode takes the last close and stamps the bucket with its first
+    bar's time; line mode picks each bucket's bar with largest-triangle-three-buckets
+    and uses its close and time. Extra series already on the bars, and any array in
+    `extra` (added under that name), are sampled at that same bar.
+    """
+    extra = extra or {}
+    n = len(data)
+    if n <= points or points < 3:
+        return data.assign(**extra) if extra else data
+
+    if plot_type == "candle":
+        starts = bucket_starts(n, points)
+        rows = np.append(starts[1:], n) - 1  # Last bar of each bucket
+        ts = data.ts[starts]
+    else:
+        rows, starts = lttb(np.arange(n), data.close, points)
+        ts = data.ts[rows]
+
+    sampled = {name: np.asarray(values)[rows] for name, values in {**data.extra, **extra}.items()}
+    return Bars(ts, data.open[starts], np.maximum.reduceat(data.high, starts),
+                np.minimum.reduceat(data.low, starts), data.close[rows],
+                np.add.reduceat(data.volume, starts), data.tz, sampled)
@@ -0,0 +1,243 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import tracing
+
+MAX_ENTRIES = 64  # LRU bound on cached (ticker, interval, indicator) series
+
+##############################################
+##########    Array Kernels    ###############
+##############################################
+
+def _window_sums(x, n):
+    """Return rolling sums of x over n bars and whether each window held a NaN."""
+    finite = np.isfinite(x)
+    csum = np.concatenate([[0.0], np.cumsum(np.where(finite, x, 0.0))])
+    gaps = np.concatenate([[0], np.cumsum(~finite)])
+    return csum[n:] - csum[:-n], (gaps[n:] - gaps[:-n]) > 0
+
+def sma(x, n):
+    """Simple moving average; NaN until n bars (without NaNs) are available."""
+    x = np.asarray(x, dtype=float)
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        total, has_gap = _window_sums(x, n)
+        out[n - 1:] = np.where(has_gap, np.nan, total / n)
+    return out
+
+def rolling_std(x, n):
+    """Rolling population standard deviation; NaN until n bars are available."""
+    x = np.asarray(x, dtype=float)
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        # Shift by the first finite value to keep the sum-of-squares form numerically stable
+        finite = x[np.isfinite(x)]
+        shifted = x - finite[0] if len(finite) else x
+        s1, has_gap = _window_sums(shifted, n)
+        s2, _ = _window_sums(shifted * shifted, n)
+        mean = s1 / n
+        var = s2 / n - mean * mean
+        out[n - 1:] = np.where(has_gap, np.nan, np.sqrt(np.maximum(var, 0.0)))
+    return out
+
+def ema(x, alpha, seed=None):
+    """Exponential moving average, continuing from `seed` (the previous value) if given."""
+    x = np.asarray(x, dtype=float)
+    if seed is not None and np.isfinite(seed):
+        x = np.concatenate([[seed], x])
+        return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+    return pd.Series(x).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+##############################################
+##########     Indicators      ###############
+##############################################
+
+class Indicator:
+    """An indicator computed over bar columns, able to resume from the previous bar.
+
+    `window` is how many input bars one output depends on; the engine passes
+    window - 1 lead-in bars (NaN-padded at the start of a series) ahead of the bars
+    to compute, plus `carry`: the value of every series on the bar before them.
+    """
+
+    inputs = ("Close",)
+    window = 1
+
+    @property
+    def key(self):
+        """Identify the indicator and its parameters for caching."""
+        return (type(self).__name__,) + tuple(sorted(vars(self).items()))
+
+    def compute(self, arrays, carry):
+        """Return a dict of output series for the bars after the lead-in."""
+        raise NotImplementedError
+
+class SMA(Indicator):
+    def __init__(self, period):
+        self.period = period
+        self.window = period
+
+    def compute(self, arrays, carry):
+        return {"sma": sma(arrays["Close"], self.period)[self.window - 1:]}
+
+class EMA(Indicator):
+    def __init__(self, period):
+        self.period = period
+
+    def compute(self, arrays, carry):
+        seed = carry["ema"] if carry else None
+        return {"ema": ema(arrays["Close"], 2 / (self.period + 1), seed)}
+
+class Bollinger(Indicator):
+    def __init__(self, period=20, width=2.0):
+        self.period = period
+        self.width = width
+        self.window = period
+
+    def compute(self, arrays, carry):
+        close = arrays["Close"]
+        mid = sma(close, self.period)[self.window - 1:]
+        std = rolling_std(close, self.period)[self.window - 1:]
+        return {"middle": mid, "upper": mid + self.width * std, "lower": mid - self.width * std}
+
+class RSI(Indicator):
+    """Wilder's relative strength index."""
+
+    window = 2  # Needs the previous close
+
+    def __init__(self, period=14):
+        self.period = period
+
+    def compute(self, arrays, carry):
+        delta = np.diff(arrays["Close"])
+        gains = np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0))
+        losses = np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0))
+        alpha = 1 / self.period
+        avg_gain = ema(gains, alpha, carry["avg_gain"] if carry else None)
+        avg_loss = ema(losses, alpha, carry["avg_loss"] if carry else None)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        rsi[np.isnan(avg_gain) | np.isnan(avg_loss)] = np.nan
+        return {"rsi": rsi, "avg_gain": avg_gain, "avg_loss": avg_loss}
+
+class MACD(Indicator):
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = fast
+        self.slow = slow
+        self.signal = signal
+
+    def compute(self, arrays, carry):
+        close = arrays["Close"]
+        fast = ema(close, 2 / (self.fast + 1), carry["fast"] if carry else None)
+        slow = ema(close, 2 / (self.slow + 1), carry["slow"] if carry else None)
+        macd = fast - slow
+        signal = ema(macd, 2 / (self.signal + 1), carry["signal_line"] if carry else None)
+        return {"macd": macd, "signal_line": signal, "histogram": macd - signal, "fast": fast, "slow": slow}
+
+class VWAP(Indicator):
+    """Rolling volume-weighted average of the typical price over `period` bars."""
+
+    inputs = ("High", "Low", "Close", "Volume")
+
+    def __init__(self, period=20):
+        self.period = period
+        self.window = period
+
+    def compute(self, arrays, carry):
+        typical = (arrays["High"] + arrays["Low"] + arrays["Close"]) / 3
+        volume = arrays["Volume"]
+        pv = sma(typical * volume, self.period)
+        v = sma(volume, self.period)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(v > 0, pv / v, np.nan)
+        return {"vwap": vwap[self.window - 1:]}
+
+##############################################
+##########   Cached Evaluation   #############
+##############################################
+
+# (ticker, interval, indicator key) -> {"ts": ..., "inputs": {...}, "series": {...}}
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def _evaluate(indicator, inputs, start, carry_source):
+    """Compute an indicator for positions start.. of `inputs`, with lead-in and carry."""
+    lead = indicator.window - 1
+    lo = start - lead
+    arrays = {}
+    for name, values in inputs.items():
+        if lo < 0:
+            # Not enough history yet: pad the lead-in with NaN
+            arrays[name] = np.concatenate([np.full(-lo, np.nan), values])
+        else:
+            arrays[name] = values[lo:]
+    carry = None
+    if start > 0 and carry_source is not None:
+        carry = {name: series[start - 1] for name, series in carry_source.items()}
+    return indicator.compute(arrays, carry)
+
+def compute(indicator, data, ticker=None, interval=None):
+    """Return the indicator's series (name -> array aligned with the Bars `data`) without mutating `data`.
+
+    With a ticker and interval, results are cached. A later frame that starts inside the
+    cached range is served by slicing; bars after the last cached one (and the last one
+    itself, which may have been partial) are computed incrementally.
+    """
+    ts = data.ts
+    inputs = {name: np.asarray(data[name], dtype=float) for name in indicator.inputs}
+    if ticker is None or len(ts) == 0:
+        return _evaluate(indicator, inputs, 0, None)
+
+    key = (ticker, interval, indicator.key)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+
+    if entry is not None:
+        cached_ts = entry["ts"]
+        j = int(np.searchsorted(cached_ts, ts[0]))
+        last = len(cached_ts) - 1
+        end = j + len(ts) - 1  # Cached position of the frame's last bar
+        aligned = j <= last and cached_ts[j] == ts[0] and (end > last or cached_ts[end] == ts[-1])
+        if aligned and (end > last and ts[last - j] != cached_ts[last]):
+            aligned = False
+        if aligned:
+            # Bars before the cached last bar are final; recompute from there only if needed
+            unchanged = end < last or (end == last and all(
+                inputs[name][-1] == entry["inputs"][name][-1] or
+                (np.isnan(inputs[name][-1]) and np.isnan(entry["inputs"][name][-1]))
+                for name in inputs))
+            tracing.count("indicators.hit" if unchanged else "indicators.extend")
+            if not unchanged:
+                restart = last
+                merged = {name: np.concatenate([entry["inputs"][name][:restart], values[restart - j:]])
+                          for name, values in inputs.items()}
+                tail = _evaluate(indicator, merged, restart, entry["series"])
+                entry = {
+                    "ts": np.concatenate([cached_ts[:restart], ts[restart - j:]]),
+                    "inputs": merged,
+                    "series": {name: np.concatenate([series[:restart], tail[name]])
+                               for name, series in entry["series"].items()},
+                }
+                _store(key, entry)
+            return {name: series[j:j + len(ts)] for name, series in entry["series"].items()}
+
+    tracing.count("indicators.miss")
+    series = _evaluate(indicator, inputs, 0, None)
+    _store(key, {"ts": ts, "inputs": inputs, "series": series})
+    return series
+
+def _store(key, entry):
+    """Remember an evaluated series, evicting the least recently used."""
+    with _lock:
+        _cache[key] = entry
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+def clear():
+    """Forget all cached indicator series."""
+    with _lock:
+        _cache.clear()
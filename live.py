@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+import numpy as np
+from bars import OHLCV
+import term_chart as tc
+import sessions
+import stock_data
+
+POLL_SECONDS = float(os.environ.get("PYSTOCK_POLL_SECONDS", "15"))  # Default poll interval
+MIN_POLL_SECONDS = 5
+MAX_POLL_SECONDS = 300
+
+class LiveSession:
+    """The series behind one chart view, kept current by appending newly fetched bars."""
+
+    def __init__(self, ticker, period, interval, data, info):
+        self.ticker = ticker
+        self.period = period
+        self.interval = interval
+        self.data = data
+        self.info = info
+        self.updated = time.time()
+        # The SMA period is fixed from the bars charted at the start, so the overlay (and
+        # its cached series) stay the same as the series grows
+        charted = len(sessions.chart_bars(data, interval))
+        self.sma_period = tc.adaptive_sma_period(charted) if charted >= 10 else None
+
+    def poll(self):
+        """Fetch bars newer than the last one held and append them; return True if anything changed."""
+        # Metadata comes from its own cache and never blocks
+        self.info = stock_data.get_stock_info(self.ticker)
+        since = self.data.time(-1)
+        new = stock_data.get_new_bars(self.ticker, self.interval, since, self.data.time(0))
+        self.updated = time.time()
+        if new is None or new.empty:
+            return False
+        # The last bar held may have been partial; it is replaced, older bars are kept as-is
+        if len(new) == 1 and new.ts[0] == self.data.ts[-1] and all(
+                np.array_equal(new[name], self.data[name][-1:], equal_nan=True) for name in OHLCV):
+            return False
+        self.data = self.data.splice(new)
+        return True
+
+    def render(self, plot_type):
+        """Return the chart frame (summary and charts) for the current series."""
+        return tc.cached_frame(self.ticker, self.data, self.info, plot_type=plot_type, interval=self.interval,
+                               timeframe=self.period, instructions="", sma_period=self.sma_period)
+
+    def status(self, poll_seconds):
+        """Return the live status line shown under the chart."""
+        return (f"LIVE {self.interval}: polling every {poll_seconds:g}s, "
+                f"last update {time.strftime('%H:%M:%S', time.localtime(self.updated))} | "
+                "'+'/'-' poll faster/slower, 'r' refresh now, any other key to stop")
+
+async def run_live(ticker, period, interval, plot_type, data, info, poll_seconds=POLL_SECONDS):
+    """Auto-refresh a chart, redrawing only the screen rows that change between polls."""
+    session = LiveSession(ticker, period, interval, data, info)
+    screen = tc.Screen()
+    screen.clear()
+    frame = session.render(plot_type)
+    screen.draw(frame + session.status(poll_seconds))
+    next_poll = time.monotonic() + poll_seconds
+    key = None
+
+    while True:
+        if key is None:
+            # Wait for a key until the next poll is due, so input stays responsive between polls
+            try:
+                key = await asyncio.wait_for(tc.read_key(), max(0.0, next_poll - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+        if key is None or key.lower() == 'r':
+            # Polls run on the executor; a key pressed during a slow one is handled right away
+            changed, key = await tc.until_key(tc.run_blocking(session.poll))
+            # Charts are only rebuilt when bars changed; otherwise just the status line moves
+            if changed:
+                frame = session.render(plot_type)
+            next_poll = time.monotonic() + poll_seconds
+        elif key == '+':
+            poll_seconds = max(MIN_POLL_SECONDS, poll_seconds / 2)
+            next_poll = min(next_poll, time.monotonic() + poll_seconds)
+            key = None
+        elif key == '-':
+            poll_seconds = min(MAX_POLL_SECONDS, poll_seconds * 2)
+            key = None
+        else:
+            # Any other key stops live mode
+            return
+        # Only rows whose text differs are rewritten
+        screen.draw(frame + session.status(poll_seconds))
@@ -1,7 +1,69 @@
-from main_menu import main_menu
+import os
+import sys
+import argparse
+
+def parse_args(argv):
+    """Parse command-line options; with no tickers the interactive menu runs."""
+    parser = argparse.ArgumentParser(description="Terminal stock charts. Give tickers to render snapshots without the interactive menu.")
+    parser.add_argument("tickers", nargs="*", help="ticker symbols, or @file with one or more per line")
+    parser.add_argument("--period", default="6mo", help="time frame to fetch (default: 6mo)")
+    parser.add_argument("--interval", default="1d", help="bar interval (default: 1d)")
+    parser.add_argument("--chart", choices=["line", "candle"], default="line", help="chart type (default: line)")
+    parser.add_argument("--compare", action="store_true", help="render one chart comparing the tickers (percent change and return correlations)")
+    parser.add_argument("--out", help="write one <TICKER>.txt per ticker to this directory instead of stdout")
+    parser.add_argument("--width", type=int, default=120, help="columns to render for (default: 120)")
+    parser.add_argument("--height", type=int, default=50, help="lines to render for (default: 50)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--no-color", action="store_true", help="strip ANSI colors from the output")
+    parser.add_argument("--daemon", action="store_true", help="stay resident with everything imported; later runs are handed to it and start at once")
+    parser.add_argument("--serve", action="store_true", help="serve bars, indicators and chart frames over a local HTTP/WebSocket API")
+    parser.add_argument("--host", default="127.0.0.1", help="address to serve on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to serve on (default: 8765)")
+    parser.add_argument("--trace", metavar="FILE", help="start with the timing overlay on and write per-session span and cache stats to FILE as JSON on exit")
+    return parser.parse_args(argv)
+
+def main(argv=None, forward=True):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if args.daemon:
+        import resident
+        return resident.serve()
+    if args.serve:
+        import server
+        return server.serve(args.host, args.port)
+    # A running daemon (see --daemon) takes over with its modules already imported
+    if forward and not os.environ.get("PYSTOCK_NO_DAEMON"):
+        import resident
+        code = resident.forward(argv)
+        if code is not None:
+            return code
+
+    if not args.tickers:
+        from main_menu import main_menu
+        if args.trace:
+            import tracing
+            tracing.enable()
+        try:
+            main_menu()
+        finally:
+            if args.trace:
+                tracing.dump(args.trace)
+        return 0
+
+    import batch
+    from watchlist import parse_symbols
+    tickers = parse_symbols(" ".join(args.tickers))
+    if args.compare:
+        missing = batch.run_compare(tickers, period=args.period, interval=args.interval, out=args.out,
+                                    columns=args.width, lines=args.height, color=not args.no_color)
+        return 1 if missing else 0
+    failed = batch.run_batch(tickers, period=args.period, interval=args.interval, plot_type=args.chart,
+                             out=args.out, columns=args.width, lines=args.height,
+                             workers=args.workers, color=not args.no_color)
+    return 1 if failed else 0
 
 if __name__ == "__main__":
     try:
-        main_menu()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\nProgram terminated by user.")
@@ -1,20 +1,44 @@
-import term_chart as tc
-from stock_data import get_stock_data
+import sys
+import threading
+import terminal
+import tracing
+
+INFO_WAIT = 2  # Seconds a first chart waits for metadata never fetched before (keys still cancel)
+
+# Only light modules are imported up front so the menu shows at once; charting,
+# pandas and the data providers load on a background thread while the user types.
+
+def preload():
+    """Import the chart and data modules and warm the provider ahead of the first chart."""
+    try:
+        import asyncio
+        import term_chart
+        import prefetch
+        import watchlist
+        import live
+        import stock_data
+        stock_data.get_provider().warm()
+    except Exception:
+        pass  # Importing again on first use raises the error where it can be shown
 
 def main_menu():
     """Display main menu and get user input."""
+    threading.Thread(target=preload, name="preload", daemon=True).start()
+
     # Default settings
     current_period = "6mo"
     current_chart_type = "line"
     current_interval = "1d"  # Default interval
     
     while True:
-        tc.clear_screen()
+        terminal.clear_screen()
         print("\n==== Terminal Stock Chart Application ====")
         print("\nEnter a ticker symbol (e.g., AAPL, MSFT, GOOGL)")
+        print("Enter several symbols (e.g., AAPL, MSFT GOOGL) or @file for a watchlist")
         print("Type 'exit' to quit")
         
-        ticker = input("\nTicker: ").strip().upper()
+        entry = input("\nTicker: ").strip()
+        ticker = entry.upper()
         
         if ticker.lower() == 'exit':
             print("Goodbye!")
@@ -23,10 +47,23 @@ def main_menu():
         if not ticker:
             continue
         
+        # Several symbols (or a file of them) open the watchlist instead of a single chart
+        if entry.startswith("@") or len(entry.replace(",", " ").split()) > 1:
+            import watchlist
+            try:
+                symbols = watchlist.parse_symbols(entry)
+            except OSError as e:
+                print(f"Error reading watchlist: {str(e)}")
+                input("\nPress Enter to continue...")
+                continue
+            if symbols:
+                watchlist.run_watchlist(symbols, period=current_period, interval=current_interval)
+            continue
+        
         # Only show period selection if we don't have a saved one
         if not current_period:
             # Time period options
-            tc.clear_screen()
+            terminal.clear_screen()
             print(f"\nSelected ticker: {ticker}")
             print("\nSelect time period:")
             print("1. 1 Day")
@@ -58,7 +95,7 @@ def main_menu():
         # Only show chart type selection if we don't have a saved one
         if not current_chart_type:
             # Chart type options
-            tc.clear_screen()
+            terminal.clear_screen()
             print(f"\nSelected ticker: {ticker} for period: {current_period}")
             print("\nSelect chart type:")
             print("1. Line Chart (default)")
@@ -73,19 +110,50 @@ def main_menu():
             else:
                 current_chart_type = "line"  # Fallback to line chart for invalid inputs
         
-        # Process for continuous lookups
-        while True:
-            # Fetch and display data
-            tc.clear_screen()
-            print(f"\nFetching data for {ticker}...")
-            print(f"Using period: {current_period}, chart type: {current_chart_type}, interval: {current_interval}")
-            
-            try:
-                data, info = get_stock_data(ticker, period=current_period, interval=current_interval)
+        # Chart view for this ticker; it keeps any period/interval changes made there
+        import asyncio
+        current_period, current_interval = asyncio.run(
+            chart_view(ticker, current_period, current_chart_type, current_interval))
+
+async def chart_view(ticker, current_period, current_chart_type, current_interval):
+    """Show charts for a ticker until the user leaves, returning the period and interval in use.
+
+    Fetches run on an executor while keys are read asynchronously, so a key pressed
+    during a slow fetch is acted on at once and the fetch is abandoned.
+    """
+    # Usually already imported by preload; otherwise this waits for it to finish
+    import term_chart as tc
+    import prefetch
+    import live
+    import sessions
+    from stock_data import get_stock_data
+
+    # Process for continuous lookups
+    while True:
+        # Spans from here to the next key press make up the timing overlay
+        tracing.begin_frame()
+        # Fetch and display data
+        tc.clear_screen()
+        print(f"\nFetching data for {ticker}...")
+        print(f"Using period: {current_period}, chart type: {current_chart_type}, interval: {current_interval}")
+        print("Press 's', 'c' or 't' to change the view, any other key to cancel")
+
+        data = None
+        try:
+            result, key = await tc.until_key(
+                tc.run_blocking(get_stock_data, ticker, current_period, current_interval, INFO_WAIT))
+            if key is None:
+                data, info = result
                 if data is not None and not data.empty:
                     try:
                         print(f"Plotting {current_chart_type} chart for {ticker}...")
-                        tc.plot_stock_data(data, info, plot_type=current_chart_type, interval=current_interval, timeframe=current_period)
+                        # Views seen recently with the same bars and terminal size come from the frame cache
+                        sys.stdout.write(tc.cached_frame(ticker, data, info, plot_type=current_chart_type, interval=current_interval, timeframe=current_period))
+                        if tracing.enabled:
+                            print("\n" + tracing.overlay(tc.terminal_size()[0] - 1), end="")
+                        sys.stdout.flush()
+                        # Warm the cache with the views the next key press is likely to open
+                        prefetch.schedule(ticker, current_period, current_interval)
                     except Exception as e:
                         print(f"Error plotting data: {str(e)}")
                         print("Basic stock information:")
@@ -95,40 +163,55 @@ def main_menu():
                 else:
                     print(f"Error fetching data for {ticker}. Please check the ticker symbol and try again.")
                     input("\nPress Enter to continue...")
-                    break
-            except Exception as e:
-                print(f"Error in data processing: {str(e)}")
-                input("\nPress Enter to continue...")
-                break
-            
-            # Get key press
-            key = tc.get_key()
-            
-            # 's' key for new search
-            if key.lower() == 's':
-                new_ticker = tc.prompt_for_ticker()
-                if new_ticker:
-                    ticker = new_ticker
-                    continue  # Stay in the inner loop with the new ticker
-                else:
-                    # User canceled the search, continue showing current ticker
-                    continue
-            # 'c' key for changing interval
-            elif key.lower() == 'c':
-                new_interval = tc.prompt_for_interval(current_period)
-                if new_interval:
-                    current_interval = new_interval
-                continue  # Stay in the inner loop with the new interval
-            # 't' key for changing time frame
-            elif key.lower() == 't':
-                new_timeframe = tc.prompt_for_timeframe()
-                if new_timeframe:
-                    # Check if new_timeframe is a tuple (timeframe, interval)
-                    if isinstance(new_timeframe, tuple):
-                        current_period, current_interval = new_timeframe
-                    else:
-                        current_period = new_timeframe
-                continue  # Stay in the inner loop with the new time frame
+                    return current_period, current_interval
+                # Get key press
+                key = await tc.read_key()
+        except Exception as e:
+            print(f"Error in data processing: {str(e)}")
+            input("\nPress Enter to continue...")
+            return current_period, current_interval
+
+        # 's' key for new search
+        if key.lower() == 's':
+            new_ticker = tc.prompt_for_ticker()
+            if new_ticker:
+                if new_ticker != ticker:
+                    prefetch.cancel()
+                ticker = new_ticker
+                continue  # Stay in the inner loop with the new ticker
             else:
-                # Any other key returns to main menu
-                break 
\ No newline at end of file
+                # User canceled the search, continue showing current ticker
+                continue
+        # 'c' key for changing interval
+        elif key.lower() == 'c':
+            new_interval = tc.prompt_for_interval(current_period)
+            if new_interval:
+                current_interval = new_interval
+            continue  # Stay in the inner loop with the new interval
+        # 'l' key for live mode (auto-refresh)
+        elif key.lower() == 'l':
+            if data is not None:
+                await live.run_live(ticker, current_period, current_interval, current_chart_type, data, info)
+            continue  # Redraw the regular chart view
+        # 'e' key switches between dropping and shading pre/post-market bars
+        elif key.lower() == 'e':
+            sessions.toggle_extended_hours()
+            continue
+        # 'p' key toggles the timing overlay
+        elif key.lower() == 'p':
+            tracing.enable(not tracing.enabled)
+            continue
+        # 't' key for changing time frame
+        elif key.lower() == 't':
+            new_timeframe = tc.prompt_for_timeframe(current_interval)
+            if new_timeframe:
+                # Check if new_timeframe is a tuple (timeframe, interval)
+                if isinstance(new_timeframe, tuple):
+                    current_period, current_interval = new_timeframe
+                else:
+                    current_period = new_timeframe
+            continue  # Stay in the inner loop with the new time frame
+        else:
+            # Any other key returns to main menu
+            prefetch.cancel()
+            return current_period, current_interval
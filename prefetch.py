@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import term_chart as tc
+import stock_data
+
+MAX_WORKERS = 2  # Concurrency cap on speculative fetches
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="prefetch")
+_lock = threading.Lock()
+_ticker = None   # Ticker the queued prefetches belong to
+_pending = {}    # (ticker, period, interval) -> Future
+
+def likely_views(period, interval):
+    """Return the (period, interval) views the user is likely to open next from this one."""
+    views = [
+        (period, tc.default_interval(period)),  # 'c' then Enter
+        ("1mo", interval),                      # 't' then Enter
+    ]
+    # Neighbouring time frames in the 't' menu
+    if period in tc.TIMEFRAMES:
+        position = tc.TIMEFRAMES.index(period)
+        for neighbour in tc.TIMEFRAMES[max(0, position - 1):position + 2]:
+            views.append((neighbour, tc.timeframe_interval(neighbour, interval)))
+    # Drop the view already on screen and duplicates, keeping order
+    return [view for view in dict.fromkeys(views) if view != (period, interval)]
+
+def _warm(ticker, period, interval):
+    """Load one view into the caches unless its ticker has been cancelled meanwhile."""
+    with _lock:
+        if ticker != _ticker:
+            return
+    # get_stock_data never raises; failures just leave the cache cold
+    stock_data.get_stock_data(ticker, period=period, interval=interval)
+
+def schedule(ticker, period, interval):
+    """Speculatively fetch the likely next views for a ticker in the background."""
+    global _ticker
+    # Only worth it when results land in the bar cache
+    if not stock_data.get_provider().cacheable:
+        return
+    with _lock:
+        if ticker != _ticker:
+            _cancel_locked()
+            _ticker = ticker
+        for view in likely_views(period, interval):
+            key = (ticker,) + view
+            future = _pending.get(key)
+            if future is None or future.done():
+                _pending[key] = _executor.submit(_warm, ticker, *view)
+
+def _cancel_locked():
+    """Cancel queued prefetches; fetches already running finish into the cache."""
+    global _ticker
+    for future in _pending.values():
+        future.cancel()
+    _pending.clear()
+    _ticker = None
+
+def cancel():
+    """Cancel all prefetches, e.g. when the user moves to another ticker."""
+    with _lock:
+        _cancel_locked()
@@ -0,0 +1,369 @@
+import os
+import json
+import math
+import time
+import zlib
+import random
+import threading
+import numpy as np
+import pandas as pd
+import tracing
+from bar_cache import BarStore, INTERVAL_SECONDS, parse_period
+
+# Requests per second to remote providers, shared by every thread in the process (0 = unlimited)
+RATE_LIMIT = float(os.environ.get("PYSTOCK_RATE_LIMIT", "4"))
+BURST = 8           # Requests allowed back to back before the rate limit applies
+RETRIES = 3         # Extra attempts for a request failing with a transient error
+BACKOFF = 0.5       # Seconds before the first retry; doubles with each one
+MAX_BACKOFF = 8.0
+
+class DataProvider:
+    """Source of OHLCV history and ticker metadata behind get_stock_data."""
+
+    name = "base"
+    cacheable = True  # Whether results should go through the on-disk bar cache
+
+    def history(self, ticker, interval, period=None, start=None):
+        """Return a yfinance-style history DataFrame for a period, or from `start` on."""
+        raise NotImplementedError
+
+    def info(self, ticker):
+        """Return a yfinance-style info dict."""
+        raise NotImplementedError
+
+    def warm(self):
+        """Load whatever the first request would otherwise wait on."""
+
+    def transient(self, error):
+        """Check whether a failed request is worth retrying (throttling, network trouble)."""
+        return False
+
+class RateLimiter:
+    """Token bucket pacing requests from all threads; callers past the burst queue up in turn."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take a token, sleeping until it is due; return the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            # Tokens go negative to reserve a place in the queue
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds`, e.g. after the provider pushed back."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+_limiter = RateLimiter(RATE_LIMIT, BURST)
+
+def set_rate_limit(rate):
+    """Change the process-wide request rate, e.g. to split it between worker processes."""
+    with _limiter._lock:
+        _limiter.rate = rate
+
+class SessionProvider(DataProvider):
+    """Wraps a remote provider so its requests share the rate limit and transient failures are retried.
+
+    Retries back off exponentially with jitter, and pause the shared limiter too,
+    so other threads don't keep hitting a provider that is throttling us.
+    """
+
+    def __init__(self, inner, limiter=None):
+        self.inner = inner
+        self.limiter = limiter or _limiter
+        self.name = inner.name
+        self.cacheable = inner.cacheable
+
+    def _call(self, func, *args, **kwargs):
+        for attempt in range(RETRIES + 1):
+            if self.limiter.acquire():
+                tracing.count("provider.throttled")
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == RETRIES or not self.inner.transient(e):
+                    raise
+                delay = min(MAX_BACKOFF, BACKOFF * 2 ** attempt) * random.uniform(0.5, 1.0)
+                tracing.count("provider.retry")
+                if self.limiter.rate > 0:
+                    self.limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+
+    def history(self, ticker, interval, period=None, start=None):
+        return self._call(self.inner.history, ticker, interval, period=period, start=start)
+
+    def info(self, ticker):
+        return self._call(self.inner.info, ticker)
+
+    def warm(self):
+        self.inner.warm()
+
+    def transient(self, error):
+        return self.inner.transient(error)
+
+_yf = None
+
+def _yfinance():
+    """Import yfinance on first use; it is the slowest import in the app and offline providers never need it."""
+    global _yf
+    if _yf is None:
+        import yfinance
+        # Raise network errors instead of returning empty frames, so they can be retried;
+        # releases without yfinance.config keep hiding them, which reads as no bars
+        config = getattr(yfinance, "config", None)
+        if config is not None:
+            config.debug.hide_exceptions = False
+        _yf = yfinance
+    return _yf
+
+def _yf_errors(*names):
+    """Return the named yfinance exception classes this release has (older ones lack some)."""
+    exceptions = getattr(_yfinance(), "exceptions", None)
+    return tuple(getattr(exceptions, name) for name in names if hasattr(exceptions, name))
+
+class YahooProvider(DataProvider):
+    """Live data from Yahoo Finance.
+
+    yfinance sends every Ticker's requests through one shared HTTP session, so
+    connections and the auth cookie are reused across calls and threads.
+    """
+
+    name = "yahoo"
+
+    def warm(self):
+        _yfinance()
+
+    def transient(self, error):
+        # Throttling, Yahoo being down, or the network (curl errors are OSErrors)
+        return isinstance(error, _yf_errors("YFRateLimitError", "YFDataException") + (OSError,))
+
+    def history(self, ticker, interval, period=None, start=None):
+        stock = _yfinance().Ticker(ticker)
+        # Intraday bars include pre/post-market; charts drop or shade them
+        prepost = INTERVAL_SECONDS.get(interval, 86400) < 86400
+        try:
+            if start is not None:
+                return stock.history(start=start, interval=interval, prepost=prepost)
+            return stock.history(period=period, interval=interval, prepost=prepost)
+        except _yf_errors("YFException") as e:
+            if self.transient(e):
+                raise
+            # Unknown or delisted symbols, unsupported periods: no bars, as before
+            return pd.DataFrame()
+
+    def info(self, ticker):
+        return _yfinance().Ticker(ticker).info
+
+def _fixture_path(directory, ticker, interval, extension="bars"):
+    """Return the fixture file holding the bars for a ticker and interval."""
+    return os.path.join(directory, f"{ticker.replace(os.sep, '_')}_{interval}.{extension}")
+
+def _info_path(directory, ticker):
+    """Return the fixture file holding the info dict for a ticker."""
+    return os.path.join(directory, f"{ticker.replace(os.sep, '_')}.info.json")
+
+def _slice_store(store, period=None, start=None):
+    """Slice a store the way the provider would, treating its last bar as 'now'."""
+    if start is not None:
+        lo = store.position(pd.Timestamp(start).tz_convert("UTC").value)
+    else:
+        now = pd.Timestamp(int(store.ts[-1]), tz="UTC")
+        lo, _ = store.slice_bounds(period, now)
+    return store.to_frame(lo)
+
+class ReplayProvider(DataProvider):
+    """Deterministic playback of frames and info dicts recorded under a fixture directory."""
+
+    name = "replay"
+    cacheable = False  # Fixtures are already local
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._stores = {}
+
+    def history(self, ticker, interval, period=None, start=None):
+        key = (ticker, interval)
+        if key not in self._stores:
+            path = _fixture_path(self.directory, ticker, interval)
+            if not os.path.exists(path):
+                # Fixtures recorded before the archive format
+                path = _fixture_path(self.directory, ticker, interval, "npz")
+            self._stores[key] = BarStore.load(ticker, interval, path)
+        store = self._stores[key]
+        if store is None or len(store.ts) == 0:
+            return pd.DataFrame()
+        return _slice_store(store, period, start)
+
+    def info(self, ticker):
+        path = _info_path(self.directory, ticker)
+        if not os.path.exists(path):
+            return {"symbol": ticker}
+        with open(path) as f:
+            return json.load(f)
+
+class RecordingProvider(DataProvider):
+    """Pass-through to another provider that saves everything it returns as replay fixtures."""
+
+    name = "record"
+    cacheable = False  # Every request must reach the provider to be recorded
+
+    def __init__(self, inner, directory):
+        self.inner = inner
+        self.directory = directory
+
+    def history(self, ticker, interval, period=None, start=None):
+        frame = self.inner.history(ticker, interval, period=period, start=start)
+        if frame is not None and not frame.empty:
+            path = _fixture_path(self.directory, ticker, interval)
+            fresh = BarStore.from_frame(ticker, interval, frame, full=(period == "max"))
+            store = BarStore.load(ticker, interval, path)
+            if store is None:
+                store = fresh
+            else:
+                store.merge(fresh)
+            store.save(path)
+        return frame
+
+    def info(self, ticker):
+        info = self.inner.info(ticker)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(_info_path(self.directory, ticker), "w") as f:
+            json.dump(info, f, default=str)
+        return info
+
+# Bar frequency of daily-and-longer intervals for the synthetic calendar
+_CALENDAR_FREQ = {"1d": "B", "5d": "5B", "1wk": "W-MON", "1mo": "MS", "3mo": "QS"}
+
+# Synthetic intraday sessions run 04:00-20:00 like US extended hours (local minutes)
+SESSION_OPEN = 4 * 60
+SESSION_MINUTES = 16 * 60
+
+class SyntheticProvider(DataProvider):
+    """Seeded random-walk bars on a weekday calendar, with pre/post-market intraday, at any size.
+
+    Series are anchored at a fixed end time and generated backwards from it, so the
+    same (ticker, interval) always yields the same bars whatever period is asked for.
+    Pass `bars` to force a series length regardless of period (for load testing).
+    """
+
+    name = "synthetic"
+    cacheable = False
+
+    def __init__(self, bars=None, seed=0, end="2024-01-02 16:00", tz="America/New_York"):
+        self.bars = bars
+        self.seed = seed
+        self.end = pd.Timestamp(end)
+        self.tz = tz
+
+    def _bar_count(self, interval, period):
+        """Estimate how many bars a period spans, erring on the high side."""
+        seconds = INTERVAL_SECONDS.get(interval, 86400)
+        per_session = max(1, math.ceil(SESSION_MINUTES * 60 / seconds)) if seconds < 86400 else 1
+        unit, count = parse_period(period or "1mo")
+        if unit == "d":
+            sessions = count
+        elif unit == "max":
+            # Yahoo keeps about 60 days of intraday bars and decades of daily ones
+            sessions = 60 if seconds < 86400 else 20 * 252
+        elif unit == "ytd":
+            sessions = 260
+        else:
+            days = {"wk": 7, "mo": 31, "y": 366}[unit] * count
+            sessions = days * 5 // 7 + 5
+        if seconds >= 86400:
+            # Convert sessions to calendar time, then to bars of this length
+            return max(1, math.ceil(sessions * 7 / 5 * 86400 / seconds))
+        return sessions * per_session
+
+    def _timestamps(self, interval, n):
+        """Return the last n bar times (tz-aware) ending at the anchor."""
+        seconds = INTERVAL_SECONDS.get(interval, 86400)
+        if seconds >= 86400:
+            index = pd.date_range(end=self.end.normalize(), periods=n, freq=_CALENDAR_FREQ.get(interval, "B"))
+            return index.tz_localize(self.tz, ambiguous=False, nonexistent="shift_forward")
+        # Intraday: bars from 04:00 (pre-market) to 20:00 (post-market), laid out as days x offsets, up to the anchor
+        per_session = max(1, math.ceil(SESSION_MINUTES * 60 / seconds))
+        days = pd.bdate_range(end=self.end.normalize(), periods=math.ceil(n / per_session) + 1)
+        offsets = (SESSION_OPEN * 60 + np.arange(per_session) * seconds) * 10**9
+        local = (days.values.astype("datetime64[ns]").astype(np.int64)[:, None] + offsets[None, :]).ravel()
+        local = local[local <= self.end.value][-n:]
+        return pd.DatetimeIndex(pd.to_datetime(local)).tz_localize(self.tz, ambiguous=False, nonexistent="shift_forward")
+
+    def _walk(self, ticker, interval, n):
+        """Generate n bars of OHLCV, newest first in generation order so prefixes are stable."""
+        key = zlib.crc32(f"{ticker}:{interval}".encode())
+        rng = lambda stream: np.random.default_rng([self.seed, key, stream])
+        scale = math.sqrt(INTERVAL_SECONDS.get(interval, 86400) / 86400) * 0.02
+        returns = rng(0).normal(0, scale, n)
+        # returns[k] is the move into the bar k steps back from the end
+        close = (100 + key % 400) * np.exp(-np.concatenate([[0.0], np.cumsum(returns[:-1])]))
+        gap = rng(1).normal(0, scale / 4, n)
+        open_ = np.concatenate([close[1:], close[-1:]]) * np.exp(gap)
+        high = np.maximum(open_, close) * (1 + np.abs(rng(2).normal(0, scale / 2, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng(3).normal(0, scale / 2, n)))
+        volume = rng(4).lognormal(13, 0.5, n).astype(np.int64)
+        # Flip to oldest-first
+        return open_[::-1], high[::-1], low[::-1], close[::-1], volume[::-1]
+
+    def history(self, ticker, interval, period=None, start=None):
+        n = self.bars or self._bar_count(interval, period)
+        index = self._timestamps(interval, n)
+        index.name = "Date" if INTERVAL_SECONDS.get(interval, 86400) >= 86400 else "Datetime"
+        open_, high, low, close, volume = self._walk(ticker, interval, len(index))
+        frame = pd.DataFrame({
+            "Open": open_,
+            "High": high,
+            "Low": low,
+            "Close": close,
+            "Volume": volume,
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        }, index=index)
+        if self.bars:
+            return frame
+        return _slice_store(BarStore.from_frame(ticker, interval, frame), period, start)
+
+    def info(self, ticker):
+        close = self._walk(ticker, "1d", 252)[3]
+        return {
+            "symbol": ticker,
+            "longName": f"{ticker} (synthetic)",
+            "sector": "Synthetic",
+            "industry": "Random Walk",
+            "marketCap": float(close[-1]) * 1e9,
+            "fiftyTwoWeekHigh": float(close.max()),
+            "fiftyTwoWeekLow": float(close.min()),
+        }
+
+def from_spec(spec):
+    """Build a provider from a spec string: 'yahoo', 'replay:DIR', 'record:DIR' or 'synthetic[:BARS]'."""
+    name, _, arg = (spec or "yahoo").partition(":")
+    if name == "yahoo":
+        return SessionProvider(YahooProvider())
+    if name == "replay":
+        return ReplayProvider(arg or "fixtures")
+    if name == "record":
+        return RecordingProvider(SessionProvider(YahooProvider()), arg or "fixtures")
+    if name == "synthetic":
+        return SyntheticProvider(bars=int(arg) if arg else None)
+    raise ValueError(f"Unknown data provider: {spec}")
@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import stat
+import signal
+import socket
+import struct
+import traceback
+
+# A resident daemon imports everything once and forks a worker per invocation. The
+# client hands over its terminal (stdin, stdout and stderr descriptors) with the
+# command line, so the worker draws and reads keys exactly as a local run would.
+
+MAX_MESSAGE = 256 * 1024  # Bytes; the request carries the client's environment
+FORWARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGWINCH)
+# Settings that don't change what modules read at import time
+LOCAL_SETTINGS = ("PYSTOCK_SOCKET", "PYSTOCK_NO_DAEMON")
+
+def socket_path():
+    """Return the daemon's socket: PYSTOCK_SOCKET, or a per-user socket in the runtime directory.
+
+    Without a runtime directory the socket goes in a private pystock-<uid> directory
+    under /tmp rather than in /tmp itself, where anyone could create it first.
+    """
+    if os.environ.get("PYSTOCK_SOCKET"):
+        return os.environ["PYSTOCK_SOCKET"]
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(os.environ["XDG_RUNTIME_DIR"], f"pystock-{os.getuid()}.sock")
+    return os.path.join(_fallback_dir(), "pystock.sock")
+
+def _fallback_dir():
+    """Return the private directory holding the socket when there's no runtime directory."""
+    return os.path.join("/tmp", f"pystock-{os.getuid()}")
+
+def _owned(path):
+    """Return whether `path` exists and belongs to this user."""
+    try:
+        return os.lstat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+def _private_dir(directory):
+    """Create the socket's directory if needed; return whether only this user can use it."""
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return False
+    info = os.lstat(directory)
+    return stat.S_ISDIR(info.st_mode) and info.st_uid == os.getuid() and not info.st_mode & 0o077
+
+def _settings(env):
+    """Return the PYSTOCK_* variables that modules read when they are imported."""
+    return {name: value for name, value in env.items()
+            if name.startswith("PYSTOCK_") and name not in LOCAL_SETTINGS}
+
+def _send(sock, message):
+    sock.send(json.dumps(message).encode())
+
+def _receive(sock):
+    """Return the next message, or None once the other side has gone."""
+    data = sock.recv(MAX_MESSAGE)
+    return json.loads(data) if data else None
+
+def _peer_uid(conn):
+    """Return the uid of the process on the other end, or None where the platform can't tell."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    _, uid, _ = struct.unpack("3i", conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")))
+    return uid
+
+def forward(argv, path=None):
+    """Run a command line in the resident daemon and return its exit code.
+
+    Returns None when no daemon is serving or it can't take the request (e.g. it
+    was started with different PYSTOCK_* settings), so the caller runs locally.
+    """
+    path = path or socket_path()
+    # The request carries the environment and the terminal, so only hand them to our own daemon
+    if not _owned(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    try:
+        sock.connect(path)
+        uid = _peer_uid(sock)
+        if uid is not None and uid != os.getuid():
+            return None
+        request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+        socket.send_fds(sock, [json.dumps(request).encode()], [0, 1, 2])
+        reply = _receive(sock)
+        if not reply or "pid" not in reply:
+            return None
+        pid = reply["pid"]
+
+        def relay(signum, frame):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+        # Ctrl-C and window resizes reach this process, not the worker, so pass them on
+        previous = {signum: signal.signal(signum, relay) for signum in FORWARDED_SIGNALS}
+        try:
+            reply = _receive(sock)
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        # The worker died without reporting back
+        return 1 if reply is None else reply["exit"]
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+
+def _worker(conn):
+    """Serve one request on a forked worker and return its exit code."""
+    message, fds, _, _ = socket.recv_fds(conn, MAX_MESSAGE, 3)
+    if not message:
+        return 0  # A liveness check, not a request
+    request = json.loads(message)
+    if len(fds) != 3 or _settings(request["env"]) != _settings(os.environ):
+        _send(conn, {"refused": "settings differ from the daemon's"})
+        return 1
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    # The daemon's streams were set up for wherever it was started; these point at the client's
+    sys.stdin = open(0, closefd=False)
+    sys.stdout = open(1, "w", buffering=1 if os.isatty(1) else -1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+    _send(conn, {"pid": os.getpid()})
+
+    import main
+    try:
+        code = main.main(request["argv"], forward=False)
+    except KeyboardInterrupt:
+        print("\nProgram terminated by user.")
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        code = 1
+    return code or 0
+
+def _running(path):
+    """Return whether a daemon is accepting connections on `path`."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+def serve(path=None):
+    """Import and warm everything, then run each client's command line on a forked worker."""
+    path = path or socket_path()
+    if _running(path):
+        print(f"A daemon is already serving {path}", file=sys.stderr)
+        return 1
+
+    # Everything a worker needs is imported here, once; no threads are started before forking
+    import main_menu
+    import batch
+    main_menu.preload()
+
+    directory = os.path.dirname(path)
+    if directory == _fallback_dir() and not _private_dir(directory):
+        print(f"{directory} is not a private directory owned by this user", file=sys.stderr)
+        return 1
+    if os.path.lexists(path):
+        if not (_owned(path) and stat.S_ISSOCK(os.lstat(path).st_mode)):
+            print(f"{path} exists and is not this user's socket; not replacing it", file=sys.stderr)
+            return 1
+        os.unlink(path)  # Left behind by a daemon that didn't shut down cleanly
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    old_umask = os.umask(0o177)  # Only the owner may connect
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen()
+    # Finished workers are reaped by the kernel; SIGTERM shuts down through the finally below
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving on {path}", file=sys.stderr)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            uid = _peer_uid(conn)
+            if uid is not None and uid != os.getuid():
+                conn.close()
+                continue
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                # Batch mode waits on its own worker processes
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                code = 1
+                try:
+                    code = _worker(conn)
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    try:
+                        _send(conn, {"exit": code})
+                    except OSError:
+                        pass
+                    os._exit(code)
+            conn.close()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        server.close()
+        os.unlink(path)
@@ -0,0 +1,403 @@
+import sys
+import json
+import math
+import time
+import base64
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import plotext as plt
+import term_chart as tc
+import bar_cache
+import stock_data
+import indicators
+import live
+
+# Serves bars, indicator series and rendered chart frames to any number of local
+# clients. Each view (ticker, period, interval) is fetched once into a Feed shared
+# by everyone reading it, so provider load doesn't grow with the number of viewers.
+#
+#   GET /bars?ticker=AAPL&period=6mo&interval=1d[&since=NS]   OHLCV columns as JSON
+#   GET /indicators?ticker=AAPL&name=sma&args=20              indicator series as JSON
+#   GET /frame?ticker=AAPL&chart=line&width=120&height=50     the chart view as ANSI text
+#   GET /info?ticker=AAPL                                     ticker metadata as JSON
+#   GET /ws?ticker=AAPL[&frames=1&chart=...&width=...]        WebSocket: a snapshot, then
+#                                                             new bars (and frames) as they arrive
+
+PORT = 8765
+MAX_FEEDS = 64    # LRU bound on views kept without subscribers
+INFO_WAIT = 5     # Seconds /info waits for metadata that isn't cached yet
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"  # RFC 6455, section 1.3
+
+INDICATORS = {
+    "sma": indicators.SMA,
+    "ema": indicators.EMA,
+    "bollinger": indicators.Bollinger,
+    "rsi": indicators.RSI,
+    "macd": indicators.MACD,
+    "vwap": indicators.VWAP,
+}
+DEFAULT_ARGS = {"sma": [20], "ema": [20]}  # For indicators without a default period
+FLOAT_ARGS = {("bollinger", 1)}  # (indicator, position) of arguments that aren't whole periods
+FRAME_SIZES = range(20, 1001)    # Widths and heights a frame may be rendered at
+
+# plotext and the render size are process-wide, so frames are rendered one at a time
+_render_lock = threading.Lock()
+
+def _series(values):
+    """Return an array as a JSON-ready list, with NaN as null."""
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        return np.where(np.isnan(values), None, values).tolist()
+    return values.tolist()
+
+def bars_message(kind, ticker, interval, data):
+    """Return bars as a JSON-ready dict of columns; times are UTC nanoseconds."""
+    return {
+        "type": kind, "ticker": ticker, "interval": interval, "tz": data.tz,
+        "ts": data.ts.tolist(), "open": _series(data.open), "high": _series(data.high),
+        "low": _series(data.low), "close": _series(data.close), "volume": data.volume.tolist(),
+    }
+
+class Feed:
+    """One view's bars, fetched once and shared by every client reading or watching it.
+
+    Reads top the bars up at most once per poll interval. While WebSocket clients are
+    subscribed a poller thread does that instead and pushes each change to all of them.
+    """
+
+    def __init__(self, ticker, period, interval):
+        self.ticker = ticker
+        self.period = period
+        self.interval = interval
+        self.session = None   # LiveSession holding the bars, once fetched
+        self.checked = 0.0    # monotonic time of the last fetch or poll
+        self.subscribers = set()
+        self.poller = None
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        """Return (data, info), fetching the view on first use and topping it up when stale.
+
+        Concurrent callers wait on the same fetch rather than making their own.
+        """
+        with self.lock:
+            if self.session is None:
+                data, info = stock_data.get_stock_data(self.ticker, period=self.period, interval=self.interval)
+                if data is None or data.empty:
+                    raise LookupError(info.get("error") or f"No data for {self.ticker}")
+                self.session = live.LiveSession(self.ticker, self.period, self.interval, data, info)
+                self.checked = time.monotonic()
+            elif self.poller is None and time.monotonic() - self.checked >= live.POLL_SECONDS:
+                self._poll_locked()
+            return self.session.data, self.session.info
+
+    def _poll_locked(self):
+        """Fetch new bars; return the changed tail (from the last bar held before) or None."""
+        since = self.session.data.ts[-1]
+        changed = self.session.poll()
+        self.checked = time.monotonic()
+        if not changed:
+            return None
+        data = self.session.data
+        return data[int(np.searchsorted(data.ts, since)):]
+
+    def subscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.add(subscriber)
+            if self.poller is None:
+                self.poller = threading.Thread(target=self._run_poller, name=f"feed-{self.ticker}", daemon=True)
+                self.poller.start()
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def _run_poller(self):
+        """Poll while anyone is subscribed, sending each change to every subscriber."""
+        try:
+            while True:
+                time.sleep(live.POLL_SECONDS)
+                with self.lock:
+                    if not self.subscribers:
+                        self.poller = None
+                        return
+                    tail = self._poll_locked()
+                    subscribers = list(self.subscribers)
+                    data, info = self.session.data, self.session.info
+                if tail is None:
+                    continue
+                message = bars_message("bars", self.ticker, self.interval, tail)
+                frames = {}  # Each distinct chart type and size is rendered once for everyone
+                for subscriber in subscribers:
+                    subscriber.send(message)
+                    if subscriber.frame_spec is not None:
+                        if subscriber.frame_spec not in frames:
+                            frames[subscriber.frame_spec] = render(self, data, info, *subscriber.frame_spec)
+                        subscriber.send({"type": "frame", "frame": frames[subscriber.frame_spec]})
+        finally:
+            # After an error too, so the next subscriber (or read) polls again; a poller
+            # started since this one stopped is left alone
+            with self.lock:
+                if self.poller is threading.current_thread():
+                    self.poller = None
+
+_feeds = OrderedDict()  # (ticker, period, interval) -> Feed, least recently used first
+_feeds_lock = threading.Lock()
+
+def get_feed(ticker, period, interval):
+    """Return the shared feed for a view, creating it on first use."""
+    key = (ticker, period, interval)
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None:
+            feed = _feeds[key] = Feed(ticker, period, interval)
+        _feeds.move_to_end(key)
+        # Views being watched are kept whatever their age
+        idle = [k for k, f in _feeds.items() if not f.subscribers]
+        for k in idle[:max(0, len(_feeds) - MAX_FEEDS)]:
+            del _feeds[k]
+    return feed
+
+def render(feed, data, info, plot_type, width, height, color):
+    """Return a view's chart frame for a given chart type and size."""
+    with _render_lock:
+        tc.set_terminal_size(width, height)
+        frame = tc.cached_frame(feed.ticker, data, info, plot_type=plot_type, interval=feed.interval,
+                                timeframe=feed.period, instructions="", sma_period=feed.session.sma_period)
+    return frame if color else plt.uncolorize(frame)
+
+def parse_args(name, text):
+    """Return an indicator's arguments from a comma-separated list (ValueError if any is invalid)."""
+    args = []
+    for position, arg in enumerate(arg for arg in text.split(",") if arg):
+        # Periods must be whole numbers; int() rejects '2.5' rather than passing a float on
+        value = float(arg) if (name, position) in FLOAT_ARGS else int(arg)
+        if not math.isfinite(value) or value <= 0:
+            raise ValueError("arguments must be greater than 0")
+        args.append(value)
+    return args
+
+def ws_accept(key):
+    """Return the Sec-WebSocket-Accept value answering a client's Sec-WebSocket-Key."""
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+def _ws_frame(payload, opcode=0x1):
+    """Encode one unfragmented, unmasked WebSocket frame (server to client)."""
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + struct.pack(">H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack(">Q", len(payload))
+    return header + payload
+
+def _ws_read(rfile):
+    """Read one client frame; return (opcode, payload), or None when the connection ends."""
+    head = rfile.read(2)
+    if len(head) < 2:
+        return None
+    opcode, length = head[0] & 0x0F, head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack(">H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", rfile.read(8))[0]
+    mask = rfile.read(4) if head[1] & 0x80 else None
+    payload = rfile.read(length)
+    if mask:
+        payload = (np.frombuffer(payload, np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), length)).tobytes()
+    return opcode, payload
+
+class Subscriber:
+    """A WebSocket client watching a feed."""
+
+    def __init__(self, wfile, frame_spec):
+        self.wfile = wfile
+        self.frame_spec = frame_spec  # (plot_type, width, height, color), or None for bars only
+        self.closed = False
+        self.pending = []  # Pushes that arrive before the snapshot is sent; None once it has been
+        self._lock = threading.Lock()  # The poller and the connection's own thread both send
+
+    def send(self, message, opcode=0x1):
+        """Send a JSON message (or raw bytes for control frames); a dead connection is just marked closed."""
+        with self._lock:
+            if self.pending is not None:
+                self.pending.append((message, opcode))
+            else:
+                self._write(message, opcode)
+
+    def start(self, messages):
+        """Send the snapshot messages, then anything pushed while they were being prepared."""
+        with self._lock:
+            for message in messages:
+                self._write(message, 0x1)
+            for message, opcode in self.pending:
+                self._write(message, opcode)
+            self.pending = None
+
+    def _write(self, message, opcode):
+        if self.closed:
+            return
+        payload = message if isinstance(message, bytes) else json.dumps(message).encode()
+        try:
+            self.wfile.write(_ws_frame(payload, opcode))
+            self.wfile.flush()
+        except OSError:
+            self.closed = True
+
+class BadRequest(ValueError):
+    """A request with missing or invalid parameters."""
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients polling reuse their connection
+    server_version = "pystock"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        routes = {"/bars": self.get_bars, "/indicators": self.get_indicators, "/frame": self.get_frame,
+                  "/info": self.get_info, "/ws": self.get_ws}
+        route = routes.get(url.path)
+        if route is None:
+            return self.send_json({"error": f"Unknown path {url.path}"}, 404)
+        try:
+            route(query)
+        except BadRequest as e:
+            self.send_json({"error": str(e)}, 400)
+        except LookupError as e:
+            self.send_json({"error": str(e)}, 404)
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, message, status=200):
+        self.send_body(json.dumps(message).encode(), "application/json", status)
+
+    def feed(self, query):
+        """Return the feed for the view a request names."""
+        ticker = query.get("ticker", "").strip().upper()
+        if not ticker:
+            raise BadRequest("ticker is required")
+        period, interval = query.get("period", "6mo"), query.get("interval", "1d")
+        try:
+            _, count = bar_cache.parse_period(period)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        if count == 0:
+            raise BadRequest(f"Unsupported period: {period}")
+        if interval not in bar_cache.INTERVAL_SECONDS:
+            raise BadRequest(f"interval must be one of {', '.join(bar_cache.INTERVAL_SECONDS)}")
+        return get_feed(ticker, period, interval)
+
+    def frame_spec(self, query):
+        """Return the (plot_type, width, height, color) a request asks frames in."""
+        plot_type = query.get("chart", "line")
+        if plot_type not in ("line", "candle"):
+            raise BadRequest("chart must be 'line' or 'candle'")
+        try:
+            width, height = int(query.get("width", 120)), int(query.get("height", 50))
+        except ValueError:
+            raise BadRequest("width and height must be integers")
+        if width not in FRAME_SIZES or height not in FRAME_SIZES:
+            raise BadRequest(f"width and height must be between {FRAME_SIZES[0]} and {FRAME_SIZES[-1]}")
+        return plot_type, width, height, query.get("color", "1") != "0"
+
+    def get_bars(self, query):
+        feed = self.feed(query)
+        data, _ = feed.snapshot()
+        if "since" in query:
+            try:
+                data = data[int(np.searchsorted(data.ts, int(query["since"]))):]
+            except ValueError:
+                raise BadRequest("since must be nanoseconds since the epoch")
+        self.send_json(bars_message("bars", feed.ticker, feed.interval, data))
+
+    def get_indicators(self, query):
+        feed = self.feed(query)
+        name = query.get("name", "sma").lower()
+        if name not in INDICATORS:
+            raise BadRequest(f"name must be one of {', '.join(INDICATORS)}")
+        try:
+            args = parse_args(name, query.get("args", ""))
+            indicator = INDICATORS[name](*(args or DEFAULT_ARGS.get(name, [])))
+        except (ValueError, TypeError):
+            raise BadRequest(f"Invalid arguments for {name}")
+        data, _ = feed.snapshot()
+        series = indicators.compute(indicator, data, feed.ticker, feed.interval)
+        self.send_json({"ticker": feed.ticker, "interval": feed.interval, "name": name, "ts": data.ts.tolist(),
+                        "series": {key: _series(values) for key, values in series.items()}})
+
+    def get_frame(self, query):
+        feed = self.feed(query)
+        spec = self.frame_spec(query)
+        data, info = feed.snapshot()
+        self.send_body(render(feed, data, info, *spec).encode(), "text/plain; charset=utf-8")
+
+    def get_info(self, query):
+        ticker = query.get("ticker", "").strip().upper()
+        if not ticker:
+            raise BadRequest("ticker is required")
+        self.send_json(stock_data.get_stock_info(ticker, wait=INFO_WAIT))
+
+    def get_ws(self, query):
+        key = self.headers.get("Sec-WebSocket-Key")
+        if self.headers.get("Upgrade", "").lower() != "websocket" or not key:
+            raise BadRequest("WebSocket upgrade expected")
+        feed = self.feed(query)
+        spec = self.frame_spec(query) if query.get("frames") == "1" else None
+        feed.snapshot()  # Fetched before the upgrade, so an unknown ticker still gets a 404
+
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", ws_accept(key))
+        self.end_headers()
+        self.close_connection = True
+
+        # Subscribed before the snapshot is taken, so no tail pushed in between is missed;
+        # pushes are held back until the snapshot has gone out
+        subscriber = Subscriber(self.wfile, spec)
+        feed.subscribe(subscriber)
+        try:
+            data, info = feed.snapshot()
+            messages = [bars_message("snapshot", feed.ticker, feed.interval, data)]
+            if spec is not None:
+                messages.append({"type": "frame", "frame": render(feed, data, info, *spec)})
+            subscriber.start(messages)
+            # Updates are sent by the feed's poller; this thread only answers control frames
+            while not subscriber.closed:
+                message = _ws_read(self.rfile)
+                if message is None:
+                    break
+                opcode, payload = message
+                if opcode == 0x8:  # Close
+                    subscriber.send(payload[:2], opcode=0x8)
+                    break
+                if opcode == 0x9:  # Ping
+                    subscriber.send(payload, opcode=0xA)
+        except OSError:
+            pass
+        finally:
+            feed.unsubscribe(subscriber)
+
+def serve(host="127.0.0.1", port=PORT):
+    """Serve the HTTP/WebSocket API until interrupted."""
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    print(f"Serving on http://{host}:{httpd.server_address[1]}/", file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+    return 0
@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import pandas as pd
+from bar_cache import INTERVAL_SECONDS
+
+DAY_NS = 86400 * 10**9
+MINUTE_NS = 60 * 10**9
+TICK_SPACING = 12  # Chart columns per x-axis label ('mm/dd' or 'HH:MM' plus a gap)
+
+# Regular trading hours as local (open, close) minutes after midnight, by exchange
+# timezone; intraday bars outside them are pre/post-market. Exchanges not listed are
+# taken to trade regular hours only.
+REGULAR_HOURS = {
+    "America/New_York": (570, 960),
+    "America/Toronto": (570, 960),
+    "Europe/London": (480, 990),
+    "Europe/Berlin": (540, 1050),
+    "Europe/Paris": (540, 1050),
+    "Europe/Amsterdam": (540, 1050),
+    "Asia/Tokyo": (540, 930),
+    "Asia/Hong_Kong": (570, 960),
+    "Australia/Sydney": (600, 960),
+}
+
+# What charts do with pre/post-market bars: leave them out, or draw them dimmed
+EXTENDED_MODES = ("drop", "shade")
+extended_hours = os.environ.get("PYSTOCK_EXTENDED_HOURS", "drop")
+
+def toggle_extended_hours():
+    """Switch charts between dropping and shading pre/post-market bars."""
+    global extended_hours
+    position = EXTENDED_MODES.index(extended_hours) if extended_hours in EXTENDED_MODES else -1
+    extended_hours = EXTENDED_MODES[(position + 1) % len(EXTENDED_MODES)]
+
+def regular_hours(local, tz):
+    """Return a mask of the local times (ns) inside regular trading hours, or None when all are."""
+    hours = REGULAR_HOURS.get(tz)
+    if not hours:
+        return None
+    minute = (local % DAY_NS) // MINUTE_NS
+    regular = (minute >= hours[0]) & (minute < hours[1])
+    return None if regular.all() else regular
+
+def is_intraday(interval):
+    """Return whether bars of this interval are shorter than a trading day."""
+    return INTERVAL_SECONDS.get(interval, 86400) < 86400
+
+class Sessions:
+    """Trading sessions of a series, found once from its bars' local days.
+
+    `starts` holds the position of each session's first bar (every bar starts one for
+    daily-and-longer intervals). `regular` marks the bars inside regular trading
+    hours, or is None when all of them are.
+    """
+
+    __slots__ = ("starts", "regular", "intraday")
+
+    def __init__(self, starts, regular=None, intraday=True):
+        self.starts = starts
+        self.regular = regular
+        self.intraday = intraday
+
+    def regular_only(self, data):
+        """Return (bars, sessions) without the pre/post-market bars."""
+        if self.regular is None:
+            return data, self
+        rows = np.flatnonzero(self.regular)
+        # Each session now starts at its first regular bar; all-extended sessions vanish
+        starts = np.unique(np.searchsorted(rows, self.starts))
+        return data.take(rows), Sessions(starts[starts < len(rows)], None, self.intraday)
+
+    def extended(self, data, view):
+        """Return a mask of the bars in `view` (a selection of `data`'s bars) outside regular hours."""
+        if self.regular is None:
+            return None
+        mask = ~self.regular[np.searchsorted(data.ts, view.ts)]
+        return mask if mask.any() else None
+
+def find_sessions(data, interval):
+    """Split a series into trading sessions (vectorized, once per series)."""
+    if not is_intraday(interval) or data.empty:
+        return Sessions(np.arange(len(data)), None, intraday=False)
+    local = data.local_ns()
+    day = local // DAY_NS
+    starts = np.flatnonzero(np.diff(day, prepend=day[0] - 1))
+    return Sessions(starts, regular_hours(local, data.tz))
+
+def format_ticks(view, positions, formats):
+    """Format only the bars at tick positions, each with its own strftime format."""
+    times = pd.to_datetime(view.ts[positions], utc=True).tz_convert(view.tz)
+    return [time.strftime(fmt) for time, fmt in zip(times, formats)]
+
+def chart_bars(data, interval):
+    """Return bars as charts show them by default: in drop mode, without pre/post-market bars."""
+    if extended_hours == "shade" or data is None or data.empty:
+        return data
+    data, _ = find_sessions(data, interval).regular_only(data)
+    return data
+
+def ticks(sessions, data, view, width):
+    """Return x-axis (positions, labels) for `view`, a reduced selection of `data`'s bars.
+
+    Intraday, each session start is labelled with its date and, when sessions are few
+    enough, times of day are spread inside them; otherwise ticks are spaced evenly
+    and show dates. Work is proportional to the sessions, not the bars.
+    """
+    n = len(view)
+    if n == 0:
+        return [], []
+    budget = max(2, width // TICK_SPACING)
+    if not sessions.intraday:
+        positions = np.unique(np.linspace(0, n - 1, min(budget, n)).astype(np.int64))
+        return positions.tolist(), format_ticks(view, positions, ["%m/%d"] * len(positions))
+
+    # Where each session begins on the plotted x-axis (sessions narrower than a column merge)
+    firsts = np.unique(np.searchsorted(view.ts, data.ts[sessions.starts]))
+    firsts = firsts[firsts < n]
+    if len(firsts) >= budget:
+        step = -(-len(firsts) // budget)
+        positions = firsts[::step]
+        return positions.tolist(), format_ticks(view, positions, ["%m/%d"] * len(positions))
+
+    per_session = budget // len(firsts)
+    positions, formats = [], []
+    for first, end in zip(firsts, np.append(firsts[1:], n)):
+        inner = np.unique(np.linspace(first, end, per_session + 1)[1:-1].astype(np.int64))
+        inner = inner[(inner > first) & (inner < end)]
+        positions += [int(first)] + inner.tolist()
+        formats += ["%m/%d"] + ["%H:%M"] * len(inner)
+    return positions, format_ticks(view, np.asarray(positions, dtype=np.int64), formats)
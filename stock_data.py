@@ -1,10 +1,129 @@
-import yfinance as yf
+import os
+import threading
+from concurrent.futures import Future
+import bar_cache
+import ticker_info
+import providers
+import sessions
+import tracing
+from bars import Bars
 
-def get_stock_data(ticker, period="1mo", interval="1d"):
-    """Fetch stock data using yfinance."""
+# Active data source; PYSTOCK_PROVIDER selects e.g. 'replay:fixtures' or 'synthetic'
+_provider = providers.from_spec(os.environ.get("PYSTOCK_PROVIDER", "yahoo"))
+
+_inflight = {}  # request key -> Future of the identical request already being fetched
+_inflight_lock = threading.Lock()
+
+def get_provider():
+    """Return the active data provider."""
+    return _provider
+
+def set_provider(provider):
+    """Switch the data provider used by get_stock_data."""
+    global _provider
+    _provider = provider
+    # Metadata cached from another source must not leak into this one
+    ticker_info.clear()
+
+def get_stock_info(ticker, wait=0):
+    """Return cached ticker metadata without blocking unless `wait` seconds are allowed."""
+    provider = _provider
+    # Metadata is kept on disk alongside the bar store, for the same providers
+    return ticker_info.get_info(ticker, provider.info, wait=wait, persist=provider.cacheable)
+
+@tracing.traced("provider.history")
+def _history(ticker, interval, period=None, start=None):
+    """Ask the active provider for history."""
+    return _provider.history(ticker, interval, period=period, start=start)
+
+@tracing.traced("bars.from_frame")
+def _to_bars(frame):
+    """Convert a provider's history frame to Bars, or None if it holds no bars."""
+    if frame is None or frame.empty:
+        return None
+    return Bars.from_frame(frame)
+
+def _coalesce(key, func, *args):
+    """Return func(*args), sharing the result of an identical call already in flight on another thread.
+
+    A prefetch and a key press asking for the same view then cost one provider
+    request, one cache merge and one write.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        tracing.count("provider.coalesced")
+        return future.result()
+    try:
+        result = func(*args)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+
+def _load(provider, ticker, period, interval):
+    """Fetch a view's bars, through the bar cache when the provider allows it."""
+    if provider.cacheable:
+        return bar_cache.load_bars(ticker, interval, period, _history)
+    return _to_bars(_history(ticker, interval, period=period))
+
+def _tail(provider, ticker, interval, since, first=None):
+    """Fetch the bars from `since` on, through the bar cache when the provider allows it."""
+    if provider.cacheable:
+        return bar_cache.refresh_tail(ticker, interval, since, _history, first)
+    return _to_bars(_history(ticker, interval, start=since))
+
+def _bars(ticker, period, interval):
+    """Fetch a view's bars, sharing the fetch with identical requests in flight."""
+    provider = _provider
+    return _coalesce((provider, "history", ticker, period, interval), _load, provider, ticker, period, interval)
+
+@tracing.traced("get_stock_data")
+def get_stock_data(ticker, period="1mo", interval="1d", info_wait=0):
+    """Fetch stock data as Bars from the active provider, served from the local bar cache where possible.
+
+    Metadata loads in the background alongside the bars; pass `info_wait` to wait up to
+    that many seconds more for a ticker whose metadata was never fetched.
+    """
     try:
-        stock = yf.Ticker(ticker)
-        data = stock.history(period=period, interval=interval)
-        return data, stock.info
+        # Start the metadata lookup first so it overlaps the bar fetch
+        get_stock_info(ticker)
+        data = _bars(ticker, period, interval)
+        wait = 0 if ticker_info.cached(ticker) else info_wait
+        return data, get_stock_info(ticker, wait=wait)
     except Exception as e:
-        return None, {"longName": ticker, "error": str(e)} 
\ No newline at end of file
+        return None, {"longName": ticker, "error": str(e)}
+
+@tracing.traced("get_bars")
+def get_bars(ticker, period="1mo", interval="1d"):
+    """Fetch bars only (None on failure), for views that never show metadata and so skip stock.info.
+
+    Pre/post-market bars are left out unless charts are shading them, so summaries and
+    correlations match what a chart of the same view shows.
+    """
+    try:
+        return sessions.chart_bars(_bars(ticker, period, interval), interval)
+    except Exception:
+        return None
+
+@tracing.traced("get_new_bars")
+def get_new_bars(ticker, interval, since, first=None):
+    """Return bars from `since` (the last bar held, which may have been partial) onward.
+
+    When a split or dividend re-adjusted the history, bars from `first` (the first one
+    held) on come back instead, so the caller's whole series is replaced.
+    """
+    try:
+        provider = _provider
+        return _coalesce((provider, "tail", ticker, interval, since, first), _tail,
+                         provider, ticker, interval, since, first)
+    except Exception:
+        return None
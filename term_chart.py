@@ -1,24 +1,85 @@
+import io
 import os
 import sys
+import asyncio
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import termios
 import tty
+from collections import OrderedDict
 import plotext as plt
-import pandas as pd
+import numpy as np
+import downsample
+import indicators
+import sessions
+import tracing
+from terminal import get_key, clear_screen, Screen, set_terminal_size, terminal_size
 
-def get_key():
-    """Get a single keypress from the terminal."""
+# Key help shown under a chart
+CHART_INSTRUCTIONS = "Press 's' for new ticker search, 'c' to change interval, 't' to change time frame, 'l' for live mode, 'e' for pre/post-market, 'p' for timings, Enter to return to menu"
+
+MAX_FRAMES = 16  # LRU bound on cached rendered frames
+# 256-color dim green and red for shaded pre/post-market bars
+EXTENDED_COLORS = (22, 52)
+
+# Blocking calls (fetches, polls) run here so the event loop keeps reading keys meanwhile
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ui-fetch")
+
+async def read_key():
+    """Wait for a single keypress without blocking the event loop."""
+    loop = asyncio.get_running_loop()
     fd = sys.stdin.fileno()
     old_settings = termios.tcgetattr(fd)
+    ready = loop.create_future()
     try:
-        tty.setraw(sys.stdin.fileno())
-        ch = sys.stdin.read(1)
+        tty.setraw(fd, termios.TCSANOW)
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        await ready
+        return os.read(fd, 1).decode(errors="replace")
     finally:
+        # Also runs on cancellation, so the terminal is never left in raw mode
+        loop.remove_reader(fd)
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-    return ch
 
-def clear_screen():
-    """Clear the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+def run_blocking(func, *args):
+    """Run a blocking call on the UI executor and return an awaitable for its result."""
+    # Carry the caller's context along so tracing attributes the call to the current frame
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(_executor, context.run, func, *args)
+
+async def cancel_task(task):
+    """Cancel a task and wait for it to finish unwinding."""
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+async def until_key(work):
+    """Await `work` unless a key is pressed first.
+
+    Returns (result, None) when the work finishes first, or (None, key) when a key
+    does; the work is then cancelled, or abandoned if its call has already started.
+    """
+    work = asyncio.ensure_future(work)
+    key_task = asyncio.ensure_future(read_key())
+    try:
+        await asyncio.wait({work, key_task}, return_when=asyncio.FIRST_COMPLETED)
+        if key_task.done():
+            return None, key_task.result()
+        return work.result(), None
+    finally:
+        if not work.done():
+            work.cancel()
+        await cancel_task(key_task)
+
+def chart_width():
+    """Return the number of terminal columns a chart spans."""
+    terminal_width, _ = terminal_size()
+    return terminal_width - 5  # Subtract a small margin for safety
+
+def adaptive_sma_period(n):
+    """Return the SMA period for n data points: 1/4 of them, between 10 and 200."""
+    return max(10, min(200, n // 4))
 
 def check_data_availability(data, ticker_info):
     """Check if stock data is available and print message if not."""
@@ -27,15 +88,16 @@ def check_data_availability(data, ticker_info):
         return True
     return False
 
+@tracing.traced("display_stock_summary")
 def display_stock_summary(data, ticker_info):
     """Display a text summary of the stock data."""
     if "Volume" not in data.columns:
         return
         
-    avg_volume = data["Volume"].mean()
-    recent_price = data["Close"].iloc[-1]
-    price_change = data["Close"].iloc[-1] - data["Close"].iloc[0]
-    price_change_pct = (price_change / data["Close"].iloc[0]) * 100
+    avg_volume = data.volume.mean()
+    recent_price = data.close[-1]
+    price_change = data.close[-1] - data.close[0]
+    price_change_pct = (price_change / data.close[0]) * 100
     
     print(f"\nRecent Price: ${recent_price:.2f}")
     print(f"Change: ${price_change:.2f} ({price_change_pct:.2f}%)")
@@ -57,13 +119,55 @@ def display_stock_summary(data, ticker_info):
     
     print("\n")  # Add an extra line break before the graph
 
-def plot_price_chart(data, company_name, x_indices, date_labels, plot_type="line", interval="1d", timeframe="1mo"):
+def segment_series(x, y_start, y_end):
+    """Interleave (y_start, y_end) pairs with NaN breaks so many vertical segments draw as one series."""
+    x = np.asarray(x, dtype=float)
+    xs = np.column_stack([x, x, np.full(len(x), np.nan)]).ravel()
+    ys = np.column_stack([y_start, y_end, np.full(len(x), np.nan)]).ravel()
+    return xs.tolist(), ys.tolist()
+
+def color_masks(up, extended=None):
+    """Return (mask, color) pairs for up/down bars, with pre/post-market ones in dim colors."""
+    if extended is None:
+        return ((up, "green"), (~up, "red"))
+    return ((up & ~extended, "green"), (~up & ~extended, "red"),
+            (up & extended, EXTENDED_COLORS[0]), (~up & extended, EXTENDED_COLORS[1]))
+
+def plot_candles(x_indices, data, extended=None):
+    """Draw simulated candlesticks as one wick series and one body series per color."""
+    x = np.asarray(x_indices)
+    opens = data.open[x]
+    highs = data.high[x]
+    lows = data.low[x]
+    closes = data.close[x]
+    up = closes >= opens
+
+    for mask, color in color_masks(up, None if extended is None else extended[x]):
+        if not mask.any():
+            continue
+        # High and low dots share a single scatter series
+        wick_x = np.concatenate([x[mask], x[mask]]).tolist()
+        wick_y = np.concatenate([highs[mask], lows[mask]]).tolist()
+        plt.scatter(wick_x, wick_y, color=color, marker=".")
+        # Bodies are open-to-close segments separated by NaN breaks
+        body_x, body_y = segment_series(x[mask], opens[mask], closes[mask])
+        plt.plot(body_x, body_y, color=color)
+
+def sma_series(data, sma_period):
+    """Return the SMA for bars as an array, using a precomputed SMA_<n> series if present."""
+    sma_column = f'SMA_{sma_period}'
+    if sma_column in data.extra:
+        return np.asarray(data.extra[sma_column], dtype=float)
+    return indicators.sma(data.close, sma_period)
+
+@tracing.traced("plot_price_chart")
+def plot_price_chart(data, company_name, x_indices, ticks, plot_type="line", interval="1d", timeframe="1mo", sma_period=None, extended=None):
     """Plot price data in the terminal as a chart."""
     # Clear previous plot
     plt.clf()
     
     # Get terminal size and set the figure size to match terminal width
-    terminal_width, _ = os.get_terminal_size()
+    terminal_width, _ = terminal_size()
     plt.plotsize(terminal_width - 5, 20)  # Subtract a small margin for safety
     
     # Plot price chart with interval and timeframe in the title
@@ -72,40 +176,37 @@ def plot_price_chart(data, company_name, x_indices, date_labels, plot_type="line
     
     # Plot based on type
     if plot_type == "line":
-        plt.plot(x_indices, data["Close"].tolist(), color="green", label=f"{interval} : {timeframe}")
+        plt.plot(x_indices, data.close.tolist(), color="green", label=f"{interval} : {timeframe}")
+        if extended is not None:
+            # Redraw pre/post-market stretches dimmed, joined to the bars either side
+            shaded = extended | np.append(extended[1:], False) | np.append(False, extended[:-1])
+            plt.plot(x_indices, np.where(shaded, data.close, np.nan).tolist(), color=EXTENDED_COLORS[0])
     elif plot_type == "candle":
-        # Simulate candlestick with plotext
-        for i in x_indices:
-            row = data.iloc[i]
-            color = "green" if row["Close"] >= row["Open"] else "red"
-            plt.scatter([i], [row["High"]], color=color, marker=".")
-            plt.scatter([i], [row["Low"]], color=color, marker=".")
-            plt.plot([i, i], [row["Open"], row["Close"]], color=color)
+        plot_candles(x_indices, data, extended)
     
     # Add adaptive SMA to the main chart if enough data is available
-    if len(data) >= 10:  # Require at least 10 data points
+    if sma_period is None and len(data) >= 10:  # Require at least 10 data points
         # Calculate adaptive SMA period
-        sma_period = max(10, min(200, len(data) // 4))
-        sma_column = f'SMA_{sma_period}'
-        
-        # Calculate SMA if not already calculated
-        if sma_column not in data.columns:
-            data[sma_column] = data['Close'].rolling(window=sma_period).mean()
+        sma_period = adaptive_sma_period(len(data))
+
+    if sma_period:
+        sma_values = sma_series(data, sma_period)
         
         # Filter out NaN values from SMA
-        valid_indices = [i for i in x_indices if i >= (sma_period-1) and not pd.isna(data[sma_column].iloc[i])]
-        valid_sma = [data[sma_column].iloc[i] for i in valid_indices]
+        x = np.asarray(x_indices)
+        valid = ~np.isnan(sma_values[x])
         
-        if valid_indices:
-            plt.plot(valid_indices, valid_sma, color="blue", label=f"{sma_period}-SMA")
+        if valid.any():
+            plt.plot(x[valid].tolist(), sma_values[x][valid].tolist(), color="blue", label=f"{sma_period}-SMA")
     
     # Set x-ticks for price chart
-    plt.xticks(x_indices, date_labels)
+    plt.xticks(*ticks)
     
     # Show the price chart
     plt.show()
 
-def plot_volume_chart(data, company_name, x_indices, date_labels):
+@tracing.traced("plot_volume_chart")
+def plot_volume_chart(data, company_name, x_indices, ticks, extended=None):
     """Plot volume data in the terminal as a separate chart."""
     if "Volume" not in data.columns:
         return
@@ -114,67 +215,60 @@ def plot_volume_chart(data, company_name, x_indices, date_labels):
     plt.clf()
     
     # Get terminal size and set the figure size to match terminal width
-    terminal_width, _ = os.get_terminal_size()
+    terminal_width, _ = terminal_size()
     plt.plotsize(terminal_width - 5, 10)  # Subtract a small margin for sgafety
     
     plt.title(f"{company_name} Volume")
     plt.xlabel("Date")
     plt.ylabel("Volume")
-    plt.xticks(x_indices, date_labels)
+    plt.xticks(*ticks)
     
-    # Plot volume bars with colors based on price movement
-    for i in x_indices:
-        if i > 0:  # Skip first bar as we need previous close for comparison
-            # Determine color based on price movement
-            color = "green" if data["Close"].iloc[i] >= data["Close"].iloc[i-1] else "red"
-            plt.bar([i], [data["Volume"].iloc[i]], color=color)
+    # Plot volume bars with colors based on price movement, one series per color
+    x = np.asarray(x_indices)[1:]  # Skip first bar as we need previous close for comparison
+    closes = data.close
+    volumes = data.volume.astype(float)
+    up = np.diff(closes)[x - 1] >= 0
+    for mask, color in color_masks(up, None if extended is None else extended[x]):
+        if mask.any():
+            plt.bar(x[mask].tolist(), volumes[x[mask]].tolist(), color=color, reset_ticks=False)
     
     # Show the volume chart
     plt.show()
 
-def plot_sma_chart(data, company_name, x_indices, date_labels):
+@tracing.traced("plot_sma_chart")
+def plot_sma_chart(data, company_name, x_indices, ticks, sma_period=None):
     """Plot SMA in the terminal as a separate chart, adapting to available data."""
-    if "Close" not in data.columns or len(data) < 10:  # Require at least 10 data points
+    if "Close" not in data.columns or (sma_period is None and len(data) < 10):  # Require at least 10 data points
         print("Not enough data for SMA (need at least 10 data points)")
         return
         
     # Calculate adaptive SMA period based on available data
     # Use 1/4 of available data points, with a minimum of 10 and maximum of 200
-    sma_period = max(10, min(200, len(data) // 4))
+    if sma_period is None:
+        sma_period = adaptive_sma_period(len(data))
     
     # Calculate SMA with adaptive period
-    sma_column = f'SMA_{sma_period}'
-    if sma_column not in data.columns:
-        data[sma_column] = data['Close'].rolling(window=sma_period).mean()
+    sma_values = sma_series(data, sma_period)
     
     # Clear for SMA chart
     plt.clf()
     
     # Get terminal size and set the figure size to match terminal width
-    terminal_width, _ = os.get_terminal_size()
+    terminal_width, _ = terminal_size()
     plt.plotsize(terminal_width - 5, 10)  # Subtract a small margin for safety
     
     plt.title(f"{company_name} {sma_period}-SMA")
     plt.xlabel("Date")
     plt.ylabel("Price ($)")
-    plt.xticks(x_indices, date_labels)
+    plt.xticks(*ticks)
     
-    # Create a full list of x-indices to maintain alignment with main chart
-    # Fill with None for points where SMA is not available
-    full_sma_values = [None] * len(x_indices)
+    # Keep the main chart's x-indices, dropping points where SMA is not available
+    x = np.asarray(x_indices)
+    valid = ~np.isnan(sma_values[x])
     
-    # Fill in the SMA values where they exist
-    for i in x_indices:
-        if i >= (sma_period-1) and not pd.isna(data[sma_column].iloc[i]):
-            full_sma_values[i] = data[sma_column].iloc[i]
-    
-    # Filter out None values for plotting
-    valid_indices = [i for i in x_indices if full_sma_values[i] is not None]
-    valid_sma = [full_sma_values[i] for i in valid_indices]
-    
-    if valid_indices:
+    if valid.any():
         # Plot the SMA line
-        plt.plot(valid_indices, valid_sma, color="blue", label=f"{sma_period}-SMA")
+        plt.plot(x[valid].tolist(), sma_values[x][valid].tolist(), color="blue", label=f"{sma_period}-SMA")
         
         # Set the x-axis limits to match the main chart
         plt.xlim(min(x_indices), max(x_indices))
@@ -184,9 +278,21 @@ def plot_sma_chart(data, company_name, x_indices, date_labels):
     # Show the SMA chart
     plt.show()
 
-def plot_stock_data(data, ticker_info, plot_type="line", interval="1d", timeframe="1mo"):
-    """Plot stock data in the terminal."""
+def plot_stock_data(data, ticker_info, plot_type="line", interval="1d", timeframe="1mo", instructions=CHART_INSTRUCTIONS,
+                    sma_period=None):
+    """Plot stock data (Bars) in the terminal, with an adaptive SMA unless `sma_period` fixes it."""
+
+    if check_data_availability(data, ticker_info):
+        return
 
+    # Find the trading sessions once for the whole series; in drop mode pre/post-market
+    # bars are left out of everything below, summary and indicators included
+    with tracing.span("sessions"):
+        series_sessions = sessions.find_sessions(data, interval)
+        indicator_interval = interval
+        if sessions.extended_hours != "shade" and series_sessions.regular is not None:
+            data, series_sessions = series_sessions.regular_only(data)
+            indicator_interval = f"{interval}:regular"
     if check_data_availability(data, ticker_info):
         return
 
@@ -196,30 +302,87 @@ def plot_stock_data(data, ticker_info, plot_type="line", interval="1d", timefram
     # Display text summary of stock data
     display_stock_summary(data, ticker_info)
     
-    # Prepare date labels and indices for x-axis
-    dates = data.index
-    date_labels = [d.strftime("%m/%d") if hasattr(d, 'strftime') else str(d)[:5] for d in dates]
-    x_indices = list(range(len(dates)))
+
+    # Compute the adaptive SMA over the full series before it is reduced; the
+    # indicator engine caches it per ticker and only extends it for new bars
+    overlays = {}
+    if sma_period is None and len(data) >= 10:
+        sma_period = adaptive_sma_period(len(data))
+    if sma_period:
+        with tracing.span("indicators"):
+            sma = indicators.compute(indicators.SMA(sma_period), data, ticker_info.get("symbol"), indicator_interval)
+        overlays[f'SMA_{sma_period}'] = sma["sma"]
+    
+    # Reduce the series to about one point per terminal column so render cost is
+    # bounded by the screen, not the data; price and volume share the reduced x-axis
+    with tracing.span("downsample"):
+        view = downsample.downsample_bars(data, chart_width(), plot_type, extra=overlays)
+    
+    # Bars are plotted by position, so nights and weekends take no room; ticks mark
+    # session starts and are labelled from the session boundaries, not per bar
+    with tracing.span("sessions"):
+        ticks = sessions.ticks(series_sessions, data, view, chart_width())
+        extended = series_sessions.extended(data, view)
+    x_indices = list(range(len(view)))
     
     # Plot the price chart with interval and timeframe
-    plot_price_chart(data, company_name, x_indices, date_labels, plot_type, interval, timeframe)
+    plot_price_chart(view, company_name, x_indices, ticks, plot_type, interval, timeframe, sma_period, extended)
     
     # Plot volume chart if data is available
-    if "Volume" in data.columns:
-        plot_volume_chart(data, company_name, x_indices, date_labels)
+    if "Volume" in view.columns:
+        plot_volume_chart(view, company_name, x_indices, ticks, extended)
     
     # Add instruction for quick search (this will be overridden if 's' is pressed)
-    print("\nPress 's' for new ticker search, 'c' to change interval, 't' to change time frame, Enter to return to menu", end="", flush=True)
+    print(f"\n{instructions}", end="", flush=True)
+
+@tracing.traced("render")
+def render_stock_data(data, ticker_info, **kwargs):
+    """Return what plot_stock_data would print, as a string."""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        plot_stock_data(data, ticker_info, **kwargs)
+    return buffer.getvalue()
+
+# (ticker, period, interval, plot type, instructions, SMA period, terminal size, extended hours) -> (version, frame)
+_frames = OrderedDict()
+
+def data_version(data, ticker_info):
+    """Identify the bars and metadata a frame was drawn from, without hashing every bar."""
+    if data is None or data.empty:
+        return None
+    # Bars are only ever appended or have their last one revised, so the ends identify them
+    last = np.array([data.open[-1], data.high[-1], data.low[-1], data.close[-1], data.volume[-1]], dtype=float)
+    bars = (len(data), int(data.ts[0]), int(data.ts[-1]), last.tobytes())
+    return bars, tuple(sorted(ticker_info.items(), key=lambda item: item[0]))
+
+def cached_frame(ticker, data, ticker_info, plot_type="line", interval="1d", timeframe="1mo", instructions=CHART_INSTRUCTIONS,
+                 sma_period=None):
+    """Return the rendered frame for a view, reusing the last one if neither bars nor terminal size changed."""
+    key = (ticker, timeframe, interval, plot_type, instructions, sma_period, terminal_size(), sessions.extended_hours)
+    version = data_version(data, ticker_info)
+    cached = _frames.get(key)
+    if cached is not None and cached[0] == version:
+        tracing.count("frame_cache.hit")
+        _frames.move_to_end(key)
+        return cached[1]
+    tracing.count("frame_cache.miss")
+    frame = render_stock_data(data, ticker_info, plot_type=plot_type, interval=interval,
+                              timeframe=timeframe, instructions=instructions, sma_period=sma_period)
+    _frames[key] = (version, frame)
+    _frames.move_to_end(key)
+    while len(_frames) > MAX_FRAMES:
+        _frames.popitem(last=False)
+    return frame
 
 def prompt_for_ticker():
     """Prompt for a ticker with support for cancellation with ESC."""
     ticker = ""
     # Store the original instruction for restoration
-    original_instruction = "Press 's' for new ticker search, 'c' to change interval, 't' to change time frame, Enter to return to menu"
+    original_instruction = CHART_INSTRUCTIONS
     
     # Get terminal width to ensure we clear the entire line
     try:
-        terminal_width, _ = os.get_terminal_size()
+        terminal_width, _ = terminal_size()
     except:
         terminal_width = 120  # Fallback if we can't get terminal size
     
@@ -255,6 +418,30 @@ def prompt_for_ticker():
             ticker += char
             print(char, end="", flush=True)
 
+def default_interval(current_period):
+    """Return the interval prompt_for_interval picks when Enter is pressed."""
+    if current_period == "1d":
+        return "5m"  # Default to 5-minute chart for 1-day period
+    elif current_period == "5d":
+        return "1h"  # Keep 1-hour default for 5-day period
+    else:
+        return "1d"  # Default to 1-day for longer periods
+
+# Time frames offered by prompt_for_timeframe, in menu order
+TIMEFRAMES = ["1d", "10d", "1mo", "3mo", "6mo", "ytd", "1y", "2y", "5y", "max"]
+
+def timeframe_interval(timeframe, current_interval):
+    """Return the interval prompt_for_timeframe pairs with a newly selected time frame."""
+    is_minute_chart = current_interval in ["1m", "2m", "5m", "15m", "30m"] if current_interval else False
+    if timeframe == "1d":
+        return "1m"
+    elif timeframe == "10d":
+        return "1h"
+    # For other timeframes, if coming from a minute chart, set to hourly
+    elif is_minute_chart:
+        return "1h"
+    return current_interval
+
 def prompt_for_interval(current_period):
     """Prompt user to select a candlestick interval."""
     clear_screen()
@@ -337,14 +524,9 @@ def prompt_for_interval(current_period):
         # Default if any other key is pressed
         elif char in ('\r', '\n'):
             # Return default value based on period
-            if current_period == "1d":
-                return "5m"  # Default to 5-minute chart for 1-day period
-            elif current_period == "5d":
-                return "1h"  # Keep 1-hour default for 5-day period
-            else:
-                return "1d"  # Default to 1-day for longer periods
-
-def prompt_for_timeframe():
+            return default_interval(current_period)
+
+def prompt_for_timeframe(current_interval=None):
     """Prompt user to select a time frame (period)."""
     clear_screen()
     print("\n==== Select Time Frame ====")
@@ -374,11 +556,6 @@ def prompt_for_timeframe():
         "0": "max"  # Changed to 0 for single-key selection
     }
     
-    # Get the current interval to check if it's a minute chart
-    # This will need to be passed in from the calling function
-    current_interval = getattr(prompt_for_timeframe, 'current_interval', None)
-    is_minute_chart = current_interval in ["1m", "2m", "5m", "15m", "30m"] if current_interval else False
-    
     # Wait for a single keypress
     while True:
         char = get_key()
@@ -392,14 +569,10 @@ def prompt_for_timeframe():
             print(f"\nSelected: {char}")
             selected_timeframe = timeframe_map[char]
             
-            # Set default intervals for specific timeframes
-            if selected_timeframe == "1d":
-                return (selected_timeframe, "1m")
-            elif selected_timeframe == "10d":
-                return (selected_timeframe, "1h")
-            # For other timeframes, if coming from a minute chart, set to hourly
-            elif is_minute_chart:
-                return (selected_timeframe, "1h")
+            # Set default intervals for specific timeframes (and when leaving a minute chart)
+            new_interval = timeframe_interval(selected_timeframe, current_interval)
+            if new_interval != current_interval:
+                return (selected_timeframe, new_interval)
             
             # For other timeframes, just return the timeframe
             return selected_timeframe
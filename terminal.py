@@ -0,0 +1,81 @@
+import os
+import sys
+import select
+import shutil
+import termios
+import tty
+import tracing
+
+# Terminal helpers with no heavy dependencies, so the menu can use them before
+# plotext, pandas and the data providers have finished importing
+
+def get_key(timeout=None):
+    """Get a single keypress from the terminal, or None if `timeout` seconds pass first."""
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    try:
+        # TCSANOW keeps keys typed while we were busy drawing instead of flushing them
+        tty.setraw(sys.stdin.fileno(), termios.TCSANOW)
+        if timeout is not None:
+            ready, _, _ = select.select([sys.stdin], [], [], timeout)
+            if not ready:
+                return None
+        # Read straight from the descriptor so nothing sits in Python's buffer unseen by select
+        ch = os.read(fd, 1).decode(errors="replace")
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+    return ch
+
+@tracing.traced("clear_screen")
+def clear_screen():
+    """Clear the terminal screen."""
+    os.system('cls' if os.name == 'nt' else 'clear')
+
+class Screen:
+    """Tracks what each terminal line shows so redraws only rewrite the lines that changed."""
+
+    def __init__(self):
+        self.lines = {}
+
+    def clear(self):
+        """Clear the terminal with ANSI codes and forget what was shown."""
+        sys.stdout.write("\x1b[2J\x1b[H")
+        self.lines = {}
+
+    def put(self, row, text):
+        """Show text on a 1-based terminal row, unless it is already there."""
+        if self.lines.get(row) != text:
+            self.lines[row] = text
+            sys.stdout.write(f"\x1b[{row};1H{text}\x1b[K")
+
+    def draw(self, text):
+        """Show a whole frame, rewriting only the rows that differ from the last one.
+
+        A frame taller than the terminal is cut off above its last line, which stays on
+        the bottom row; rows past the bottom would all land on the last line.
+        """
+        lines = text.split("\n")
+        _, height = terminal_size()
+        if len(lines) > height:
+            lines = lines[:height - 1] + lines[-1:]
+        for row, line in enumerate(lines, start=1):
+            self.put(row, line)
+        # Blank rows left over from a taller previous frame
+        for row in [row for row in self.lines if row > len(lines)]:
+            self.put(row, "")
+        sys.stdout.flush()
+
+# (columns, lines) to render for instead of the terminal's, for headless rendering
+_size_override = None
+
+def set_terminal_size(columns, lines=50):
+    """Render charts for a fixed size from now on (None restores the terminal's size)."""
+    global _size_override
+    _size_override = (columns, lines) if columns else None
+
+def terminal_size():
+    """Return the (columns, lines) charts are rendered for."""
+    if _size_override is not None:
+        return _size_override
+    # Falls back to 120x50 when stdout is not a terminal
+    return tuple(shutil.get_terminal_size((120, 50)))
@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import bar_archive
+
+def bars(rows):
+    ts = np.arange(rows, dtype=np.int64) * 60 * 10**9
+    return ts, {"Close": np.arange(rows, dtype=float) + 100.0, "Volume": np.arange(rows, dtype=np.uint64)}
+
+def test_append_writes_in_place(tmp_path):
+    path = str(tmp_path / "AAA_1m.bars")
+    ts, columns = bars(10)
+    bar_archive.write(path, ts[:8], {name: values[:8] for name, values in columns.items()}, {})
+    inode = os.stat(path).st_ino
+    mapped_ts, mapped, _ = bar_archive.read(path)
+
+    bar_archive.write(path, ts, columns, {}, keep=8)
+    assert os.stat(path).st_ino == inode
+    # The earlier mapping still ends where it did; a new read sees the appended rows
+    assert len(mapped_ts) == 8 and mapped["Close"][-1] == 107.0
+    new_ts, new, _ = bar_archive.read(path)
+    assert np.array_equal(new_ts, ts) and np.array_equal(new["Close"], columns["Close"])
+
+def test_revised_last_bar_rewrites_without_touching_mapped_views(tmp_path):
+    path = str(tmp_path / "AAA_1m.bars")
+    ts, columns = bars(10)
+    bar_archive.write(path, ts, columns, {})
+    inode = os.stat(path).st_ino
+    _, mapped, _ = bar_archive.read(path)
+
+    revised = {name: values.copy() for name, values in columns.items()}
+    revised["Close"][-1] = 999.0
+    bar_archive.write(path, ts, revised, {}, keep=9)
+    assert os.stat(path).st_ino != inode
+    assert mapped["Close"][-1] == 109.0
+    _, new, _ = bar_archive.read(path)
+    assert new["Close"][-1] == 999.0
+
+def test_keep_shorter_than_file_rewrites(tmp_path):
+    path = str(tmp_path / "AAA_1m.bars")
+    ts, columns = bars(10)
+    bar_archive.write(path, ts, columns, {})
+    inode = os.stat(path).st_ino
+    # Only 5 of the 10 rows on disk are known unchanged, so appending in place isn't safe
+    bar_archive.write(path, ts, columns, {}, keep=5)
+    assert os.stat(path).st_ino != inode
+    new_ts, _, _ = bar_archive.read(path)
+    assert np.array_equal(new_ts, ts)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from bar_cache import BarStore
+
+def daily(start, days, close=None):
+    index = pd.bdate_range(start, periods=days, tz="America/New_York", name="Date")
+    close = np.arange(days, dtype=float) + 100.0 if close is None else close
+    return pd.DataFrame({"Close": close, "Volume": np.ones(days), "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+
+def store(frame, start=None):
+    return BarStore.from_frame("AAA", "1d", frame, start=None if start is None else pd.Timestamp(start).value)
+
+def test_merge_replaces_overlap_and_keeps_identical_rows_persisted():
+    frame = daily("2024-01-01", 10)
+    bars = store(frame)
+    bars.persisted = 10
+    # A tail fetch from the second-to-last bar: one identical bar, a revised last bar, one new
+    tail = daily("2024-01-11", 3, close=np.array([108.0, 150.0, 151.0]))
+    bars.merge(store(tail))
+    assert len(bars.ts) == 11
+    assert bars.columns["Close"][-2:].tolist() == [150.0, 151.0]
+    assert bars.persisted == 9
+
+def test_merge_drops_old_bars_that_dont_join():
+    bars = store(daily("2024-01-01", 5))
+    bars.merge(store(daily("2024-03-01", 5)))
+    assert len(bars.ts) == 5 and bars.start == bars.ts[0]
+
+def test_slice_bounds_counts_regular_sessions():
+    # Two full sessions, then pre-market bars of a third day
+    index = pd.DatetimeIndex(
+        [f"2024-01-02 {h:02d}:00" for h in range(10, 16)] + [f"2024-01-03 {h:02d}:00" for h in range(10, 16)]
+        + ["2024-01-04 05:00", "2024-01-04 06:00"], tz="America/New_York", name="Datetime")
+    frame = pd.DataFrame({"Close": np.arange(len(index), dtype=float)}, index=index)
+    bars = BarStore.from_frame("AAA", "1h", frame, start=index[0].value - 1)
+    now = pd.Timestamp("2024-01-04 07:00", tz="America/New_York")
+    lo, covered = bars.slice_bounds("1d", now)
+    # Before the open '1d' is the last full session, followed by the pre-market bars
+    assert lo == 6 and covered
+    lo, covered = bars.slice_bounds("2d", now)
+    assert lo == 0 and covered
+    assert bars.slice_bounds("3d", now) == (0, False)
+
+def test_slice_bounds_calendar_period():
+    bars = store(daily("2024-01-01", 60), start="2024-01-01")
+    lo, covered = bars.slice_bounds("1mo", pd.Timestamp("2024-03-22", tz="UTC"))
+    assert covered and pd.Timestamp(int(bars.ts[lo]), tz="UTC") >= pd.Timestamp("2024-02-22", tz="UTC")
+    assert not bars.slice_bounds("6mo", pd.Timestamp("2024-03-22", tz="UTC"))[1]
+
+def test_readjusted_by_split_dividend_or_changed_close():
+    bars = store(daily("2024-01-01", 10))
+    unchanged = daily("2024-01-11", 3, close=np.array([108.0, 109.5, 110.0]))
+    assert not bars.readjusted(store(unchanged))
+    split = unchanged.copy()
+    split.loc[split.index[-1], "Stock Splits"] = 2.0
+    assert bars.readjusted(store(split))
+    dividend = unchanged.copy()
+    dividend.loc[dividend.index[-1], "Dividends"] = 0.5
+    assert bars.readjusted(store(dividend))
+    # The second-to-last bar was final, so a changed close means the history was re-adjusted
+    changed = daily("2024-01-11", 3, close=np.array([54.0, 109.5, 110.0]))
+    assert bars.readjusted(store(changed))
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import indicators
+import tracing
+from bars import Bars
+
+INDICATORS = [indicators.SMA(5), indicators.EMA(5), indicators.RSI(), indicators.MACD(), indicators.Bollinger(),
+              indicators.VWAP()]
+
+def bars(rows, seed=0):
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, rows))
+    ts = np.arange(rows, dtype=np.int64) * 60 * 10**9
+    return Bars(ts, close, close + 1, close - 1, close, np.full(rows, 1000))
+
+@pytest.fixture(autouse=True)
+def counters():
+    indicators.clear()
+    tracing.enable()
+    tracing.reset()
+    yield lambda: tracing.stats()["counters"]
+    tracing.enable(False)
+
+def assert_same(series, expected):
+    assert series.keys() == expected.keys()
+    for name in expected:
+        assert np.allclose(series[name], expected[name], equal_nan=True), name
+
+@pytest.mark.parametrize("indicator", INDICATORS, ids=lambda indicator: type(indicator).__name__)
+def test_new_bars_extend_the_cached_series(indicator, counters):
+    data = bars(300)
+    indicators.compute(indicator, data[:250], "AAA", "1m")
+    series = indicators.compute(indicator, data, "AAA", "1m")
+    assert counters().get("indicators.extend") == 1
+    assert_same(series, indicators.compute(indicator, data))
+    # A later frame starting inside the cached range is a slice
+    assert_same(indicators.compute(indicator, data[100:], "AAA", "1m"),
+                {name: values[100:] for name, values in series.items()})
+    assert counters().get("indicators.hit") == 1
+
+@pytest.mark.parametrize("indicator", INDICATORS, ids=lambda indicator: type(indicator).__name__)
+def test_revised_last_bar_is_recomputed(indicator, counters):
+    data = bars(300)
+    first = indicators.compute(indicator, data, "AAA", "1m")
+    before = {name: values.copy() for name, values in first.items()}
+    close = data.close.copy()
+    close[-1] += 5
+    revised = Bars(data.ts, close, close + 1, close - 1, close, data.volume)
+    series = indicators.compute(indicator, revised, "AAA", "1m")
+    assert counters().get("indicators.extend") == 1
+    assert_same(series, indicators.compute(indicator, revised))
+    # Series returned earlier are left as they were
+    assert_same(first, before)
@@ -0,0 +1,15 @@
+import server
+
+def test_ws_accept_rfc6455_sample():
+    # The handshake example from RFC 6455, section 1.3
+    assert server.ws_accept("dGhlIHNhbXBsZSBub25jZQ==") == "s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+
+def test_parse_args_requires_whole_periods():
+    assert server.parse_args("sma", "20") == [20]
+    assert server.parse_args("bollinger", "20,2.5") == [20, 2.5]
+    for name, text in [("sma", "2.5"), ("bollinger", "2.5"), ("macd", "12,0,9"), ("bollinger", "20,nan")]:
+        try:
+            server.parse_args(name, text)
+        except ValueError:
+            continue
+        raise AssertionError(f"{name} accepted {text}")
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import tracing
+from bar_cache import CACHE_DIR
+
+# Fields display_stock_summary reads, with how long (seconds) each stays fresh
+FIELD_TTLS = {
+    "longName": 7 * 86400,
+    "shortName": 7 * 86400,
+    "symbol": 7 * 86400,
+    "sector": 7 * 86400,
+    "industry": 7 * 86400,
+    "marketCap": 15 * 60,
+    "fiftyTwoWeekHigh": 60 * 60,
+    "fiftyTwoWeekLow": 60 * 60,
+}
+
+MAX_TICKERS = 256     # LRU bound on the number of tickers kept
+RETRY_AFTER = 60      # Seconds to wait before retrying a ticker whose info lookup failed
+
+# ticker -> {field: (value, fetched_at)}, least recently used first
+_cache = OrderedDict()
+_pending = {}   # ticker -> Future of an in-flight lookup
+_failed = {}    # ticker -> time of the last failed lookup
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ticker-info")
+
+def _needs_refresh(entry, now):
+    """Check whether any tracked field is missing or past its TTL."""
+    if entry is None:
+        return True
+    for field, ttl in FIELD_TTLS.items():
+        cached = entry.get(field)
+        if cached is None or now - cached[1] > ttl:
+            return True
+    return False
+
+def _info_path(ticker):
+    """Return the file holding a ticker's metadata in the on-disk cache."""
+    return os.path.join(CACHE_DIR, "info", ticker.replace(os.sep, "_") + ".json")
+
+def _read(ticker):
+    """Return a ticker's metadata entry saved on disk, or None."""
+    try:
+        with open(_info_path(ticker)) as f:
+            return {field: tuple(cached) for field, cached in json.load(f).items() if field in FIELD_TTLS}
+    except (OSError, ValueError, TypeError):
+        return None
+
+def _save(ticker, entry):
+    """Write a ticker's metadata entry to disk (replaced atomically; failures are ignored)."""
+    path = _info_path(ticker)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, path)
+    except (OSError, ValueError):
+        pass
+
+def _load(ticker, fetch, persist=False):
+    """Fetch the full info dict and keep only the tracked fields."""
+    try:
+        with tracing.span("stock.info"):
+            info = fetch(ticker) or {}
+    except Exception:
+        with _lock:
+            _failed[ticker] = time.time()
+            _pending.pop(ticker, None)
+        return
+    now = time.time()
+    with _lock:
+        entry = _cache.get(ticker, {})
+        for field in FIELD_TTLS:
+            # Missing fields are cached as None so ETFs without a sector aren't refetched forever
+            entry[field] = (info.get(field), now)
+        _cache[ticker] = entry
+        _cache.move_to_end(ticker)
+        while len(_cache) > MAX_TICKERS:
+            _cache.popitem(last=False)
+        _failed.pop(ticker, None)
+        _pending.pop(ticker, None)
+        entry = dict(entry)
+    if persist:
+        _save(ticker, entry)
+
+def get_info(ticker, fetch, wait=0, persist=False):
+    """Return cached metadata for a ticker, refreshing missing or expired fields in the background.
+
+    The returned dict holds whatever is cached (stale values included) and always has
+    'symbol'. Pass `wait` to block up to that many seconds for an in-flight lookup, and
+    `persist` to keep metadata on disk, so later runs start from it.
+    """
+    now = time.time()
+    with _lock:
+        entry = _cache.get(ticker)
+        if entry is None and persist:
+            # Saved by an earlier run (or another daemon worker); stale fields still refresh
+            entry = _read(ticker)
+            if entry is not None:
+                _cache[ticker] = entry
+        if entry is not None:
+            _cache.move_to_end(ticker)
+        future = _pending.get(ticker)
+        recently_failed = now - _failed.get(ticker, 0) < RETRY_AFTER
+        stale = _needs_refresh(entry, now)
+        tracing.count("ticker_info.miss" if stale else "ticker_info.hit")
+        if future is None and not recently_failed and stale:
+            future = _executor.submit(_load, ticker, fetch, persist)
+            _pending[ticker] = future
+
+    if future is not None and wait:
+        try:
+            future.result(timeout=wait)
+        except Exception:
+            pass
+
+    with _lock:
+        entry = _cache.get(ticker, {})
+        info = {field: value for field, (value, _) in entry.items() if value is not None}
+    info.setdefault("symbol", ticker)
+    return info
+
+def cached(ticker):
+    """Check whether any metadata for a ticker has been fetched (stale or not)."""
+    with _lock:
+        return ticker in _cache
+
+def clear():
+    """Forget all cached metadata."""
+    with _lock:
+        _cache.clear()
+        _failed.clear()
@@ -0,0 +1,107 @@
+import json
+import time
+import threading
+import functools
+import contextlib
+import contextvars
+
+enabled = False  # Checked on every traced call; while False tracing costs one global lookup
+
+_lock = threading.Lock()
+_spans = {}     # name -> [calls, total seconds, max seconds] for the whole session
+_counters = {}  # name -> count for the whole session
+# Spans and counts since begin_frame(), for the overlay; propagates into executor calls
+_frame = contextvars.ContextVar("trace_frame", default=None)
+_disabled = contextlib.nullcontext()
+
+def enable(on=True):
+    """Turn tracing on or off."""
+    global enabled
+    enabled = on
+
+def begin_frame():
+    """Start collecting what the overlay shows for the redraw about to happen."""
+    _frame.set({"spans": {}, "counts": {}})
+
+def record(name, seconds):
+    """Add one timed call of `name`."""
+    with _lock:
+        stats = _spans.setdefault(name, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        frame = _frame.get()
+        if frame is not None:
+            frame["spans"][name] = frame["spans"].get(name, 0.0) + seconds
+
+def count(name, n=1):
+    """Bump a counter (e.g. a cache hit or miss)."""
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+        frame = _frame.get()
+        if frame is not None:
+            frame["counts"][name] = frame["counts"].get(name, 0) + n
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+
+def span(name):
+    """Return a context manager timing a block as `name` (a no-op while disabled)."""
+    return _Span(name) if enabled else _disabled
+
+def traced(name):
+    """Decorate a function so each call is timed as a span called `name`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def overlay(width=None):
+    """Return a one-line breakdown of the current frame's spans, slowest first, and its counters."""
+    frame = _frame.get() or {"spans": {}, "counts": {}}
+    with _lock:
+        spans = sorted(frame["spans"].items(), key=lambda item: -item[1])
+        counts = sorted(frame["counts"].items())
+    timings = "timings: " + (", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in spans) or "none")
+    counters = ", ".join(f"{name} {n}" for name, n in counts)
+    if width is not None:
+        # Counters are kept whole; the fastest spans are the ones cut off
+        room = width - (len(counters) + 3 if counters else 0)
+        if len(timings) > room:
+            timings = timings[:max(0, room - 3)] + "..."
+    return f"{timings} | {counters}" if counters else timings
+
+def stats():
+    """Return the session's span and counter totals."""
+    with _lock:
+        spans = {name: {"calls": calls, "total_ms": round(total * 1000, 3),
+                        "mean_ms": round(total * 1000 / calls, 3), "max_ms": round(longest * 1000, 3)}
+                 for name, (calls, total, longest) in _spans.items()}
+        return {"spans": spans, "counters": dict(_counters)}
+
+def dump(path):
+    """Write the session stats as JSON."""
+    with open(path, "w") as f:
+        json.dump(stats(), f, indent=1, sort_keys=True)
+
+def reset():
+    """Forget all recorded spans and counters."""
+    with _lock:
+        _spans.clear()
+        _counters.clear()
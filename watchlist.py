@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import term_chart as tc
+import compare
+from stock_data import get_bars
+
+MAX_WORKERS = 8          # Concurrent get_bars calls
+REFRESH_SECONDS = 60     # Poll interval while the table is shown
+KEY_POLL_SECONDS = 0.1   # How long keys are waited for between redraws while a refresh runs
+SPARK_WIDTH = 24         # Characters per sparkline
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="watchlist")
+
+def parse_symbols(text):
+    """Split user input into ticker symbols; '@path' entries read symbols from a file."""
+    symbols = []
+    for token in text.replace(",", " ").split():
+        if token.startswith("@"):
+            with open(os.path.expanduser(token[1:])) as f:
+                for line in f:
+                    line = line.split("#", 1)[0]
+                    symbols.extend(line.replace(",", " ").split())
+        else:
+            symbols.append(token)
+    # Uppercase and drop duplicates, keeping order
+    return list(dict.fromkeys(symbol.upper() for symbol in symbols))
+
+def sparkline(values, width=SPARK_WIDTH):
+    """Render a series as a row of block characters, bucket-averaged to `width`."""
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return ""
+    if len(values) > width:
+        starts = np.linspace(0, len(values), width + 1).astype(np.int64)[:-1]
+        values = np.add.reduceat(values, starts) / np.diff(np.append(starts, len(values)))
+    low, high = values.min(), values.max()
+    if high == low:
+        levels = np.full(len(values), len(SPARK_CHARS) // 2)
+    else:
+        levels = ((values - low) / (high - low) * (len(SPARK_CHARS) - 1)).round().astype(int)
+    return "".join(SPARK_CHARS[level] for level in levels)
+
+def summarize(data):
+    """Return (last price, change % vs the previous bar, sparkline) for Bars, or None."""
+    if data is None or data.empty:
+        return None
+    closes = data.close
+    last = closes[-1]
+    previous = closes[-2] if len(closes) > 1 else closes[-1]
+    change_pct = (last - previous) / previous * 100 if previous else 0.0
+    return last, change_pct, sparkline(closes)
+
+def format_row(symbol, summary):
+    """Format one table row, coloring the change green or red."""
+    if summary is None:
+        return f"{symbol:<10}{'--':>12}{'--':>10}  (no data)"
+    last, change_pct, spark = summary
+    color = "\x1b[32m" if change_pct >= 0 else "\x1b[31m"
+    return f"{symbol:<10}{last:>12.2f}{color}{change_pct:>+9.2f}%\x1b[0m  {spark}"
+
+def run_watchlist(symbols, period="1mo", interval="1d"):
+    """Show a live table of last price, change % and sparkline for many symbols."""
+    summaries = {}
+    lock = threading.Lock()
+    screen = tc.Screen()
+    screen.clear()
+    page = 0
+    refresh = True
+    pending = {}  # future -> symbol of fetches still running, kept across key presses
+
+    def submit(ordered):
+        """Queue fetches in order, re-queuing ones not started yet so they follow the new order."""
+        for future, symbol in list(pending.items()):
+            if future.cancel():
+                del pending[future]
+        running = set(pending.values())
+        for symbol in ordered:
+            if symbol not in running:
+                pending[_executor.submit(get_bars, symbol, period, interval)] = symbol
+
+    while True:
+        try:
+            _, terminal_height = os.get_terminal_size()
+        except OSError:
+            terminal_height = 24
+        rows_per_page = max(1, terminal_height - 4)
+        pages = max(1, -(-len(symbols) // rows_per_page))
+        page = min(page, pages - 1)
+        visible = symbols[page * rows_per_page:(page + 1) * rows_per_page]
+
+        screen.put(1, f"==== Watchlist: {len(symbols)} symbols ({period} : {interval}) page {page + 1}/{pages} ====")
+        screen.put(2, f"{'Symbol':<10}{'Last':>12}{'Change':>10}  Trend")
+        for row in range(3, 3 + rows_per_page):
+            position = row - 3
+            if position < len(visible):
+                symbol = visible[position]
+                with lock:
+                    known = symbol in summaries
+                    summary = summaries.get(symbol)
+                screen.put(row, format_row(symbol, summary) if known else f"{symbol:<10}{'...':>12}")
+            else:
+                screen.put(row, "")
+        screen.put(terminal_height, "Press 'n'/'p' for next/previous page, 'v' to compare, 'r' to refresh, 'q' or Enter to return to menu")
+        sys.stdout.flush()
+
+        visible_set = set(visible)
+        if refresh or pending:
+            # Fetch the visible symbols first, then the rest
+            ordered = visible + [symbol for symbol in symbols if symbol not in visible_set]
+            waiting = set(pending.values())
+            submit(ordered if refresh else [symbol for symbol in ordered if symbol in waiting])
+
+        # Keys are read between batches of results, so one pressed mid-refresh acts at once
+        key = None
+        while pending and key is None:
+            key = tc.get_key(timeout=KEY_POLL_SECONDS)
+            for future in [future for future in pending if future.done()]:
+                symbol = pending.pop(future)
+                summary = summarize(future.result())
+                with lock:
+                    summaries[symbol] = summary
+                if symbol in visible_set:
+                    screen.put(3 + visible.index(symbol), format_row(symbol, summary))
+            sys.stdout.flush()
+        if key is None:
+            key = tc.get_key(timeout=REFRESH_SECONDS)
+
+        refresh = key is None or key.lower() == 'r'
+        if refresh:
+            continue
+        elif key.lower() == 'n':
+            page = (page + 1) % pages
+        elif key.lower() == 'p':
+            page = (page - 1) % pages
+        elif key.lower() == 'v':
+            compare.run_compare(symbols, period=period, interval=interval)
+            screen.clear()  # Redraw the whole table from the summaries already fetched
+        else:
+            # 'q', Enter or any other key returns to the main menu; unstarted fetches are dropped
+            for future in pending:
+                future.cancel()
+            return